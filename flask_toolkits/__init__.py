@@ -4,4 +4,17 @@ from .fields import Path, Header, Query, Body
 from .params import *
 from .routing import EndpointDefinition, APIRouter
 from .swagger import AutoSwagger
-from .security import HTTPBasicSecurity, HTTPBearerSecurity
\ No newline at end of file
+from .security import HTTPBasicSecurity, HTTPBearerSecurity, APIKeySecurity, APIKeyLocation
+from .apikeys import APIKeyIndex, hash_api_key
+from .jwks import JWKSKeyProvider
+from .caching import Cache, MemoryCacheStore, SQLiteCacheStore
+from .ratelimit import RateLimit, MemoryRateLimitStore, SQLiteRateLimitStore
+from .admission import AdmissionController, Priority
+from .idempotency import Idempotency, MemoryIdempotencyStore, SQLiteIdempotencyStore
+from .dependencies import Depends
+from .deadlines import Deadline, get_deadline
+from .uploads import UploadFile
+from .compression import RequestDecompression
+from .limits import BodyLimits
+from .executors import ProcessExecutor
+from .background import BackgroundTasks, BackgroundTaskPool
\ No newline at end of file
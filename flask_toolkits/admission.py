@@ -0,0 +1,205 @@
+import math
+import threading
+import time
+from enum import IntEnum
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .responses import JSONResponse
+
+
+class Priority(IntEnum):
+    low = 0
+    normal = 1
+    high = 2
+    critical = 3
+
+
+LOW_PRIORITY_TAG = "low-priority"
+
+DEFAULT_TAG_PRIORITIES: Dict[str, Priority] = {
+    LOW_PRIORITY_TAG: Priority.low,
+    "high-priority": Priority.high,
+    "critical": Priority.critical,
+    "health": Priority.critical,
+}
+
+
+def get_priority(
+    priority: Optional[Union[Priority, int, str]] = None,
+    tags: Optional[List[str]] = None,
+    tag_priorities: Dict[str, Priority] = DEFAULT_TAG_PRIORITIES
+) -> Priority:
+    """
+    Get the endpoint's priority class from its explicit `priority` or else from its highest priority tag
+    """
+    if isinstance(priority, str):
+        return Priority[priority]
+    if priority is not None:
+        return Priority(priority)
+    tagged = [tag_priorities[tag] for tag in tags or [] if tag in tag_priorities]
+    return max(tagged) if tagged else Priority.normal
+
+
+class ConcurrencyLimit():
+    """Per-worker limit of the requests an endpoint handles at once
+
+    :param max_concurrency: maximum requests handled at once
+    :param queue_timeout: seconds a request waits for a free slot before it's rejected,
+        `0` rejects it immediately
+    :param low_priority: reject with `429 Too Many Requests` instead of `503 Service Unavailable`
+    """
+    def __init__(self, max_concurrency: int, queue_timeout: float = 0, low_priority: bool = False) -> None:
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.low_priority = low_priority
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+    @property
+    def status_code(self) -> int:
+        return 429 if self.low_priority else 503
+
+    @property
+    def description(self) -> str:
+        return "Too Many Requests" if self.low_priority else "Service Unavailable"
+
+    @classmethod
+    def from_options(
+        cls,
+        max_concurrency: Optional[int],
+        queue_timeout: float = 0,
+        priority: Priority = Priority.normal
+    ) -> Optional["ConcurrencyLimit"]:
+        if not max_concurrency:
+            return None
+        return cls(max_concurrency, queue_timeout, priority == Priority.low)
+
+    def acquire(self) -> bool:
+        if self.queue_timeout:
+            return self._semaphore.acquire(timeout=self.queue_timeout)
+        return self._semaphore.acquire(blocking=False)
+
+    def release(self) -> None:
+        self._semaphore.release()
+
+    def reject(self) -> JSONResponse:
+        return JSONResponse(
+            response={"detail": self.description},
+            status_code=self.status_code,
+            headers={"Retry-After": str(max(math.ceil(self.queue_timeout), 1))}
+        )
+
+    def __call__(self, func: Callable) -> Callable:
+        """
+        Wrap the view function, the request is rejected before anything else runs if there's no free slot
+        """
+        @wraps(func)
+        def limited_func(*args, **kwargs):
+            if not self.acquire():
+                return self.reject()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.release()
+        return limited_func
+
+
+class AdmissionController():
+    """Per-worker admission control that sheds the lowest priority requests first when the worker is busy.
+
+    A request is admitted while the in-flight requests are below its class share of the capacity.
+    The capacity shrinks when the recent latency is above `target_latency`, but `critical` requests
+    (and endpoints tagged `"health"`) can always use the full `max_in_flight`
+
+    :param max_in_flight: maximum requests handled at once by the worker
+    :param target_latency: seconds of the acceptable recent average latency, `None` disables latency tracking
+    :param shares: fraction of the capacity each priority class may fill
+    :param tag_priorities: priority classes of the endpoint tags, merged into `DEFAULT_TAG_PRIORITIES`
+    :param latency_smoothing: weight of the latest request in the moving average latency
+    """
+    def __init__(
+        self,
+        max_in_flight: int,
+        target_latency: Optional[float] = None,
+        shares: Optional[Dict[Priority, float]] = None,
+        tag_priorities: Optional[Dict[str, Union[Priority, int, str]]] = None,
+        latency_smoothing: float = 0.1
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.target_latency = target_latency
+        self.shares = {
+            Priority.low: 0.5,
+            Priority.normal: 0.8,
+            Priority.high: 0.95,
+            Priority.critical: 1.0,
+            **(shares or {})
+        }
+        self.tag_priorities = {
+            **DEFAULT_TAG_PRIORITIES,
+            **{tag: get_priority(priority) for tag, priority in (tag_priorities or {}).items()}
+        }
+        self.latency_smoothing = latency_smoothing
+        self.in_flight = 0
+        self.latency = 0.0
+        self._lock = threading.Lock()
+
+    def get_priority(self, priority: Optional[Union[Priority, int, str]] = None, tags: Optional[List[str]] = None) -> Priority:
+        return get_priority(priority, tags, self.tag_priorities)
+
+    @property
+    def capacity(self) -> float:
+        """
+        Current capacity, shrunk proportionally when the recent latency is above `target_latency`
+        """
+        if self.target_latency and self.latency > self.target_latency:
+            return self.max_in_flight * self.target_latency / self.latency
+        return self.max_in_flight
+
+    def admit(self, priority: Priority) -> bool:
+        with self._lock:
+            if priority == Priority.critical:
+                limit = self.max_in_flight
+            else:
+                limit = self.capacity * self.shares[priority]
+            if self.in_flight >= limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def done(self, elapsed: Optional[float] = None) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if elapsed is not None:
+                self.latency += (elapsed - self.latency) * self.latency_smoothing
+
+    def reject(self, priority: Priority) -> JSONResponse:
+        if priority == Priority.low:
+            status_code, detail = 429, "Too Many Requests"
+        else:
+            status_code, detail = 503, "Service Unavailable"
+        return JSONResponse(
+            response={"detail": detail},
+            status_code=status_code,
+            headers={"Retry-After": str(max(math.ceil(self.latency), 1))}
+        )
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": self.in_flight, "capacity": self.capacity, "latency": self.latency}
+
+    def __call__(self, func: Callable, priority: Priority = Priority.normal) -> Callable:
+        """
+        Wrap the view function, the request is rejected before anything else runs if it's not admitted
+        """
+        track_latency = bool(self.target_latency)
+
+        @wraps(func)
+        def admitted_func(*args, **kwargs):
+            if not self.admit(priority):
+                return self.reject(priority)
+            start = time.monotonic()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.done(time.monotonic() - start if track_latency else None)
+        return admitted_func
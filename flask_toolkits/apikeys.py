@@ -0,0 +1,80 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+
+def hash_api_key(key: str, salt: Union[str, bytes]) -> str:
+    """
+    Salted hash of an API key, use it to provision the keys of `APIKeyIndex` source
+    """
+    salt = salt.encode() if isinstance(salt, str) else salt
+    return hashlib.blake2b(key.encode(), key=salt, digest_size=32).hexdigest()
+
+
+class APIKeyIndex():
+    """In-memory index of salted API key hashes
+
+    :param source: function that receives the last cursor (`None` on the first load) and returns
+        `(changes, cursor)`, `changes` maps key hash to its principal or `None` if the key is revoked
+    :param salt: salt of `hash_api_key`
+    :param reload_interval: seconds between background incremental reloads, set `0` to disable it
+    """
+    def __init__(
+        self,
+        source: Callable[[Any], Tuple[Dict[str, Any], Any]],
+        salt: Union[str, bytes],
+        reload_interval: float = 60
+    ) -> None:
+        self.source = source
+        self.salt = salt.encode() if isinstance(salt, str) else salt
+        self.reload_interval = reload_interval
+        self._principals: Dict[str, Any] = {}
+        self._cursor = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def reload(self) -> None:
+        """
+        Apply the changes from the source since the last reload
+        """
+        with self._lock:
+            changes, self._cursor = self.source(self._cursor)
+            for key_hash, principal in changes.items():
+                if principal is None:
+                    self._principals.pop(key_hash, None)
+                else:
+                    self._principals[key_hash] = principal
+            self._loaded = True
+
+    def lookup(self, key: str) -> Optional[Any]:
+        """
+        Get the principal of the API key, or `None` if it's unknown
+        """
+        self.start()
+        return self._principals.get(hash_api_key(key, self.salt))
+
+    def start(self) -> None:
+        """
+        Load the keys and start the background reload
+        """
+        if self._loaded and (self._thread is not None or not self.reload_interval):
+            return
+        if not self._loaded:
+            self.reload()
+        with self._lock:
+            if self.reload_interval and self._thread is None:
+                self._thread = threading.Thread(target=self._reload_periodically, daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _reload_periodically(self) -> None:
+        while not self._stopped.wait(self.reload_interval):
+            try:
+                self.reload()
+            except Exception:
+                # keep serving the loaded keys until the next reload
+                continue
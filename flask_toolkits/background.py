@@ -0,0 +1,148 @@
+import atexit
+import inspect
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, current_app, has_app_context
+from typing import Any, Callable, List, Optional, Tuple
+
+from .deadlines import run_coroutine
+
+logger = logging.getLogger("flask_toolkits.background")
+
+
+class BackgroundTasks():
+    """Tasks of a request that run after its response is sent
+
+    - example : `def view(tasks: BackgroundTasks)` then `tasks.add_task(send_email, to, subject=subject)`
+    """
+    def __init__(self) -> None:
+        self.tasks: List[Tuple[Callable[..., Any], tuple, dict]] = []
+
+    def add_task(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        self.tasks.append((func, args, kwargs))
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {len(self.tasks)} tasks>"
+
+
+class BackgroundTaskPool():
+    """Per-worker bounded thread pool that runs the background tasks of the requests,
+    the tasks of a request run one by one in their order inside the app context
+
+    :param max_workers: threads of the pool
+    :param max_pending: maximum requests whose tasks wait for a thread, the next ones run their tasks
+        in the thread that sent the response so the worker slows down instead of queueing without bound
+    :param on_error: function that receives the exception and the failed task function,
+        default logs it with the app's logger
+    :param drain_timeout: seconds to wait for the pending tasks when the process exits
+    """
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_pending: int = 1000,
+        on_error: Optional[Callable[[BaseException, Callable[..., Any]], Any]] = None,
+        drain_timeout: Optional[float] = 10
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.on_error = on_error
+        self.drain_timeout = drain_timeout
+        self.pending = 0
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        atexit.register(self.shutdown)
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None or self._pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="background")
+                    self._pid = os.getpid()
+                    self.pending = 0
+        return self._pool
+
+    def report(self, error: BaseException, func: Callable[..., Any], app: Optional[Flask] = None) -> None:
+        if self.on_error:
+            try:
+                self.on_error(error, func)
+                return
+            except Exception:
+                pass
+        name = getattr(func, "__qualname__", repr(func))
+        (app.logger if app else logger).error(f"Background task '{name}' failed", exc_info=error)
+
+    def call(self, func: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        rv = func(*args, **kwargs)
+        if inspect.isawaitable(rv):
+            run_coroutine(rv)
+
+    def run(self, tasks: BackgroundTasks, app: Optional[Flask] = None) -> None:
+        """
+        Run the tasks in their order, a failed task is reported and the next ones still run
+        """
+        for func, args, kwargs in tasks.tasks:
+            try:
+                if app:
+                    with app.app_context():
+                        self.call(func, args, kwargs)
+                else:
+                    self.call(func, args, kwargs)
+            except Exception as e:
+                self.report(e, func, app)
+
+    def _run_pending(self, tasks: BackgroundTasks, app: Optional[Flask]) -> None:
+        try:
+            self.run(tasks, app)
+        finally:
+            with self._idle:
+                self.pending -= 1
+                if not self.pending:
+                    self._idle.notify_all()
+
+    def submit(self, tasks: BackgroundTasks, app: Optional[Flask] = None) -> None:
+        """Hand the tasks of a request to the pool, call it once the response is sent
+
+        :param app: app of the tasks' app context, default is the current app
+        """
+        if not len(tasks):
+            return
+        if app is None and has_app_context():
+            app = current_app._get_current_object()
+        pool = self.pool
+        with self._lock:
+            inline = self.pending >= self.max_pending
+            if not inline:
+                self.pending += 1
+        if inline:
+            self.run(tasks, app)
+            return
+        try:
+            pool.submit(self._run_pending, tasks, app)
+        except RuntimeError:
+            # the pool is shut down, the process is exiting
+            with self._idle:
+                self.pending -= 1
+            self.run(tasks, app)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the pending tasks are done, return `False` if they're still running after `timeout` seconds
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: not self.pending, timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        if wait and self._pid == os.getpid():
+            self.drain(self.drain_timeout)
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown(wait=False)
+            self._pool = None
@@ -0,0 +1,185 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional, Union
+from werkzeug.datastructures import Headers
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers.response import Response as ResponseBase
+
+from .responses import JSONResponse
+
+SAFE_METHODS = ["GET", "HEAD", "OPTIONS"]
+
+# describe the body of the batch request itself, they're never passed to the sub-requests
+_BODY_HEADERS = ["content-type", "content-length", "content-encoding", "transfer-encoding"]
+
+# apply to the batch request only, a sub-request sets its own
+_REQUEST_HEADERS = [
+    "idempotency-key",
+    "if-match",
+    "if-none-match",
+    "if-modified-since",
+    "if-unmodified-since",
+    "if-range",
+    "range",
+]
+
+
+class BatchRequest(BaseModel):
+    method: str = "GET"
+    path: str
+    query: Dict[str, Union[str, List[str]]] = {}
+    headers: Dict[str, str] = {}
+    body: Any = None
+
+
+class BatchResponse(BaseModel):
+    status: int
+    headers: Dict[str, str] = {}
+    body: Any = None
+
+
+def batch_responses_example() -> Dict[str, Any]:
+    """
+    Swagger response of the batch endpoint
+    """
+    return {
+        "description": "Responses of the sub-requests in the same order",
+        "content": {
+            "application/json": {
+                "schema": {"type": "array", "items": BatchResponse.schema()},
+                "example": [{"status": 200, "headers": {"Content-Type": "application/json"}, "body": {}}]
+            }
+        }
+    }
+
+
+class BatchDispatcher():
+    """Dispatch the sub-requests of a batch request in-process through the app's URL map and view functions,
+    every sub-request gets its own request context so it goes through the same security, validation,
+    rate limit and caching as a standalone request
+
+    Consecutive `GET`, `HEAD` and `OPTIONS` sub-requests are independent and run concurrently,
+    the other methods run one at a time in their order
+
+    :param max_concurrency: maximum sub-requests that run at once, shared by all batches of the dispatcher
+    :param request_headers: more headers of the batch request that aren't inherited by the sub-requests
+        (ex: the deadline header), the body, idempotency and conditional headers are never inherited
+    """
+    def __init__(self, max_concurrency: int = 4, request_headers: Optional[List[str]] = None) -> None:
+        self.max_concurrency = max_concurrency
+        self.excluded_headers = set(_BODY_HEADERS + _REQUEST_HEADERS + [h.lower() for h in request_headers or []])
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="batch")
+        return self._executor
+
+    def get_headers(self, sub_request: BatchRequest, headers: Headers) -> Headers:
+        """
+        Headers of the sub-request, it inherits the batch request headers (ex: `Authorization`) unless it overrides them
+        """
+        sub_headers = Headers([(k, v) for k, v in headers.items() if k.lower() not in self.excluded_headers])
+        for k, v in sub_request.headers.items():
+            sub_headers[k] = v
+        return sub_headers
+
+    def to_response(self, response: ResponseBase) -> Dict[str, Any]:
+        try:
+            if response.is_json:
+                body = response.get_json(silent=True)
+            else:
+                body = response.get_data(as_text=True) or None
+            return BatchResponse(status=response.status_code, headers=dict(response.headers), body=body).dict()
+        finally:
+            response.close()
+
+    def dispatch_one(
+        self,
+        app: Flask,
+        sub_request: BatchRequest,
+        headers: Headers,
+        endpoint: Optional[str] = None,
+        environ_base: Optional[Dict[str, Any]] = None,
+        base_url: Optional[str] = None
+    ) -> Dict[str, Any]:
+        sub_headers = self.get_headers(sub_request, headers)
+        builder_options: Dict[str, Any] = {}
+        if sub_request.body is not None:
+            if isinstance(sub_request.body, str) and "Content-Type" in sub_headers:
+                builder_options["data"] = sub_request.body
+            else:
+                builder_options["json"] = sub_request.body
+        builder = EnvironBuilder(
+            path=sub_request.path,
+            method=sub_request.method.upper(),
+            query_string=sub_request.query or None,
+            headers=sub_headers,
+            environ_base=environ_base,
+            base_url=base_url,
+            **builder_options
+        )
+        try:
+            environ = builder.get_environ()
+        finally:
+            builder.close()
+
+        # a fresh app context so the sub-request doesn't share `g` with the batch request
+        with app.app_context(), app.request_context(environ) as ctx:
+            rule = ctx.request.url_rule
+            if endpoint and rule is not None and rule.endpoint == endpoint:
+                response = JSONResponse(response={"detail": "Nested batch request is not allowed"}, status_code=400)
+            else:
+                try:
+                    response = app.full_dispatch_request()
+                except Exception as e:
+                    response = app.make_response(app.handle_exception(e))
+            return self.to_response(response)
+
+    def dispatch(
+        self,
+        app: Flask,
+        sub_requests: List[BatchRequest],
+        headers: Headers,
+        endpoint: Optional[str] = None,
+        environ_base: Optional[Dict[str, Any]] = None,
+        base_url: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Dispatch the sub-requests and return their responses in the same order
+
+        :param headers: batch request headers, inherited by the sub-requests
+        :param endpoint: endpoint name of the batch endpoint, a nested batch sub-request is answered with `400 Bad Request`
+        :param environ_base: WSGI environ values of the batch request (ex: `REMOTE_ADDR`) inherited by the sub-requests,
+            so the rate limits keyed by the client IP count them for the client
+        :param base_url: scheme, host and script root of the batch request
+        """
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(sub_requests)
+        safe: List[int] = []
+        options = {"environ_base": environ_base, "base_url": base_url}
+
+        def flush():
+            if len(safe) == 1:
+                responses[safe[0]] = self.dispatch_one(app, sub_requests[safe[0]], headers, endpoint, **options)
+            elif safe:
+                futures = {
+                    i: self.executor.submit(self.dispatch_one, app, sub_requests[i], headers, endpoint, **options)
+                    for i in safe
+                }
+                for i, future in futures.items():
+                    responses[i] = future.result()
+            safe.clear()
+
+        for i, sub_request in enumerate(sub_requests):
+            if sub_request.method.upper() in SAFE_METHODS:
+                safe.append(i)
+                continue
+            flush()
+            responses[i] = self.dispatch_one(app, sub_request, headers, endpoint, **options)
+        flush()
+        return responses
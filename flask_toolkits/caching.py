@@ -0,0 +1,502 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from flask import Request, copy_current_request_context, g
+from pydantic import BaseModel
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from werkzeug.wrappers.response import Response as ResponseBase
+
+from .codec import SwaggerJSONEncoder, codecs
+from .responses import generate_etag
+
+
+def cache_control_header(cache_control: Optional[Union[str, Dict[str, Any]]]) -> Optional[str]:
+    """Convert `cache_control` route option into `Cache-Control` header value
+
+    :param cache_control: raw header value or directives mapping
+        - example : {"max_age": 30, "public": True} -> "max-age=30, public"
+    """
+    if not cache_control:
+        return None
+    if isinstance(cache_control, str):
+        return cache_control
+    directives = []
+    for key, value in cache_control.items():
+        key = key.replace("_", "-")
+        if value is True:
+            directives.append(key)
+        elif value is not False and value is not None:
+            directives.append(f"{key}={value}")
+    return ", ".join(directives)
+
+
+def is_not_modified(req: Request, etag: str) -> bool:
+    """
+    Check the `If-None-Match` request header against the current entity tag
+    """
+    if req.method not in ["GET", "HEAD"]:
+        return False
+    return req.if_none_match.contains_weak(etag)
+
+
+def not_modified_response(etag: str, weak: bool = False, cache_control: Optional[str] = None) -> ResponseBase:
+    response = ResponseBase(status=304)
+    response.set_etag(etag, weak=weak)
+    if cache_control:
+        response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def apply_http_caching(
+    req: Request,
+    response: ResponseBase,
+    etag: bool = False,
+    weak_etag: bool = False,
+    cache_control: Optional[str] = None,
+    etag_value: Optional[str] = None
+) -> ResponseBase:
+    """Put the caching headers into successful response and
+    turn it into `304 Not Modified` if the client copy is still fresh
+
+    :param etag: compute entity tag from the response body
+    :param weak_etag: mark the computed entity tag as weak
+    :param cache_control: `Cache-Control` header value
+    :param etag_value: precomputed entity tag (ex: from `etag_func`)
+    """
+    if response.status_code != 200:
+        return response
+
+    if cache_control and "Cache-Control" not in response.headers:
+        response.headers["Cache-Control"] = cache_control
+
+    if etag_value:
+        response.set_etag(etag_value, weak=weak_etag)
+    elif etag and not response.is_streamed:
+        current_etag, _ = response.get_etag()
+        if not current_etag:
+            response.set_etag(generate_etag(response.get_data()), weak=weak_etag)
+
+    current_etag, is_weak = response.get_etag()
+    if current_etag and is_not_modified(req, current_etag):
+        return not_modified_response(current_etag, is_weak, response.headers.get("Cache-Control"))
+    return response
+
+
+def principal_identity(principal: Any) -> Any:
+    """Identity of a security principal in the cache, rate limit, authorization and idempotency keys,
+    it must be JSON serializable (ex: user id, claims dict) or a pydantic model so the same principal
+    always gets the same key. Override the security's `get_principal_key` to identify other principal objects
+    """
+    if isinstance(principal, BaseModel):
+        return json.loads(principal.json())
+    try:
+        json.dumps(principal, sort_keys=True)
+    except (TypeError, ValueError) as e:
+        raise TypeError(
+            f"principal of type '{type(principal).__name__}' can't be keyed stably, "
+            "return a JSON serializable principal or override the security's `get_principal_key`"
+        ) from e
+    return principal
+
+
+def request_key(prefix: str, kwargs: Dict[str, Any], *extra: Any) -> str:
+    """
+    Derive a stable key from endpoint prefix and the validated kwargs
+    """
+    payload = json.dumps([kwargs, extra], sort_keys=True, separators=(",", ":"), cls=SwaggerJSONEncoder)
+    return prefix + ":" + generate_etag(payload.encode())
+
+
+class CacheEntry():
+    """Stored response of a cached endpoint
+
+    :param status: response status code
+    :param headers: response headers
+    :param body: response body
+    :param tags: invalidation tags
+    :param created: creation timestamp
+    :param expires: timestamp until the entry is fresh
+    :param stale_until: timestamp until the entry is allowed to be served while revalidating
+    """
+    __slots__ = ("status", "headers", "body", "tags", "created", "expires", "stale_until")
+
+    def __init__(
+        self,
+        status: int,
+        headers: List[Tuple[str, str]],
+        body: bytes,
+        tags: Iterable[str],
+        created: float,
+        expires: float,
+        stale_until: float
+    ) -> None:
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.tags = list(tags)
+        self.created = created
+        self.expires = expires
+        self.stale_until = stale_until
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires
+
+    def is_stale(self, now: float) -> bool:
+        return self.expires <= now < self.stale_until
+
+    def to_response(self, now: float) -> ResponseBase:
+        response = ResponseBase(self.body, self.status, self.headers)
+        response.headers["Age"] = str(int(max(now - self.created, 0)))
+        return response
+
+
+class CacheStore(ABC):
+    """
+    Base class of response cache storage
+    """
+    @abstractmethod
+    def get(self, key: str) -> Optional[CacheEntry]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, entry: CacheEntry) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class MemoryCacheStore(CacheStore):
+    """In-process LRU cache storage
+
+    :param max_entries: maximum stored responses, the least recently used is evicted first
+    """
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.stale_until <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    self._tags.pop(tag)
+
+
+class SQLiteConnectionMixin():
+    """Per-thread connection of a SQLite store, it's opened again in a forked worker
+    because SQLite connections can't be used across a fork (ex: a store created with gunicorn `--preload`)
+
+    The store sets `path`, `timeout` and `_local = threading.local()`
+    """
+    isolation_level: Optional[str] = ""
+
+    def _connection(self) -> sqlite3.Connection:
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is not None and local.pid != os.getpid():
+            # kept open and unused, closing it here could checkpoint the parent's WAL.
+            # only the forking thread has one, it replaces the connection of an earlier fork
+            local.inherited = conn
+            conn = None
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=self.isolation_level)
+            conn.execute("PRAGMA journal_mode=WAL")
+            local.conn = conn
+            local.pid = os.getpid()
+        return conn
+
+
+class SQLiteCacheStore(SQLiteConnectionMixin, CacheStore):
+    """SQLite cache storage, shared by all workers that point to the same database file
+
+    :param path: database file path
+    :param max_entries: maximum stored responses, the oldest is evicted first
+    :param timeout: database lock timeout in seconds
+    """
+    def __init__(self, path: str, max_entries: int = 10000, timeout: float = 5.0) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB, tags TEXT, "
+                "created REAL, expires REAL, stale_until REAL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_tags (tag TEXT, key TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_tags_tag ON cache_tags (tag)")
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_entries_created ON cache_entries (created)")
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        row = self._connection().execute(
+            "SELECT status, headers, body, tags, created, expires, stale_until "
+            "FROM cache_entries WHERE key = ? AND stale_until > ?",
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        status, headers, body, tags, created, expires, stale_until = row
+        return CacheEntry(
+            status, [tuple(h) for h in json.loads(headers)], body, json.loads(tags), created, expires, stale_until
+        )
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache_tags WHERE key = ?", (key,))
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, entry.status, json.dumps(entry.headers), entry.body, json.dumps(entry.tags),
+                    entry.created, entry.expires, entry.stale_until
+                )
+            )
+            conn.executemany("INSERT INTO cache_tags VALUES (?, ?)", [(tag, key) for tag in entry.tags])
+            self._evict(conn)
+
+    def delete(self, key: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            conn.execute("DELETE FROM cache_tags WHERE key = ?", (key,))
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        tags = [(tag,) for tag in tags]
+        with self._connection() as conn:
+            conn.executemany(
+                "DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_tags WHERE tag = ?)", tags
+            )
+            conn.execute("DELETE FROM cache_tags WHERE key NOT IN (SELECT key FROM cache_entries)")
+
+    def clear(self) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache_entries")
+            conn.execute("DELETE FROM cache_tags")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM cache_entries WHERE stale_until <= ?", (time.time(),))
+        (total,) = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+        if total > self.max_entries:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE key IN "
+                "(SELECT key FROM cache_entries ORDER BY created LIMIT ?)",
+                (total - self.max_entries,)
+            )
+        conn.execute("DELETE FROM cache_tags WHERE key NOT IN (SELECT key FROM cache_entries)")
+
+
+class Cache():
+    """Server-side response cache for an endpoint.
+    Responses are keyed by the endpoint and its validated parameters
+
+    :param ttl: seconds until a stored response is expired
+    :param max_entries: maximum stored responses of the default `MemoryCacheStore`
+    :param stale_while_revalidate: seconds after expiration where the stored response is still served
+        while it's recomputed in background
+    :param vary_headers: request headers that make a different cache entry
+    :param vary_principal: make a different cache entry for each security principal
+    :param tags: invalidation tags, or a function that receives the validated kwargs and returns the tags
+    :param store: cache storage, use `SQLiteCacheStore` to share the cache between workers
+    """
+    def __init__(
+        self,
+        ttl: float = 60,
+        max_entries: int = 1024,
+        stale_while_revalidate: float = 0,
+        vary_headers: Optional[List[str]] = None,
+        vary_principal: bool = False,
+        tags: Optional[Union[List[str], Callable[..., Iterable[str]]]] = None,
+        store: Optional[CacheStore] = None
+    ) -> None:
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.vary_headers = [h.lower() for h in vary_headers or []]
+        self.vary_principal = vary_principal
+        self.tags = tags or []
+        self.store = store or MemoryCacheStore(max_entries)
+        self._revalidating = set()
+        self._lock = threading.Lock()
+
+    def make_key(self, prefix: str, kwargs: Dict[str, Any], req: Request, principal: Any = None) -> str:
+        headers = [req.headers.get(h) for h in self.vary_headers]
+        media_type = codecs.negotiate(req.accept_mimetypes).media_type
+        principal = principal_identity(principal) if self.vary_principal else None
+        return request_key(prefix, kwargs, headers, principal, media_type)
+
+    def get_tags(self, kwargs: Dict[str, Any]) -> List[str]:
+        if callable(self.tags):
+            return list(self.tags(**kwargs))
+        return list(self.tags)
+
+    def invalidate(self, *tags: str) -> None:
+        """
+        Remove all stored responses with any of the tags
+        """
+        self.store.invalidate_tags(tags)
+
+    def clear(self) -> None:
+        self.store.clear()
+
+    def is_cacheable(self, response: ResponseBase) -> bool:
+        return (
+            response.status_code == 200
+            and not response.is_streamed
+            and "Set-Cookie" not in response.headers
+            and not response.cache_control.no_store
+        )
+
+    def put(self, key: str, response: ResponseBase, kwargs: Dict[str, Any]) -> None:
+        if not self.is_cacheable(response):
+            return
+        now = time.time()
+        self.store.set(key, CacheEntry(
+            status=response.status_code,
+            headers=[(k, v) for k, v in response.headers.items() if k != "Age"],
+            body=response.get_data(),
+            tags=self.get_tags(kwargs),
+            created=now,
+            expires=now + self.ttl,
+            stale_until=now + self.ttl + self.stale_while_revalidate
+        ))
+
+    def get_or_compute(self, key: str, compute: Callable[[], ResponseBase], kwargs: Dict[str, Any]) -> ResponseBase:
+        """Serve the stored response, or compute and store it
+
+        :param key: cache key from `make_key`
+        :param compute: function that creates the fresh response
+        :param kwargs: validated kwargs of the endpoint
+        """
+        now = time.time()
+        entry = self.store.get(key)
+        if entry is not None:
+            if entry.is_stale(now):
+                self.revalidate(key, compute, kwargs)
+            return entry.to_response(now)
+        response = compute()
+        self.put(key, response, kwargs)
+        return response
+
+    def revalidate(self, key: str, compute: Callable[[], ResponseBase], kwargs: Dict[str, Any]) -> None:
+        """
+        Recompute the stale response in background, once per key
+        """
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+        request_globals = dict(vars(g._get_current_object()))
+        # the refresh outlives the request, it's not bound to its deadline nor its response's background tasks
+        request_globals.pop("deadline", None)
+        request_globals.pop("background_tasks", None)
+
+        @copy_current_request_context
+        def refresh():
+            try:
+                vars(g._get_current_object()).update(request_globals)
+                self.put(key, compute(), kwargs)
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+
+class _Flight():
+    __slots__ = ("done", "snapshot", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.snapshot = None
+        self.error = None
+
+
+class SingleFlight():
+    """Coalesce concurrent computations of the same key within a worker.
+    The first caller computes the response, the others wait and receive a copy of it
+    """
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, compute: Callable[[], ResponseBase]) -> ResponseBase:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.snapshot is None:
+                return compute()
+            body, status, headers = flight.snapshot
+            return ResponseBase(body, status, headers)
+
+        try:
+            response = compute()
+            if not response.is_streamed:
+                flight.snapshot = (response.get_data(), response.status_code, list(response.headers.items()))
+            return response
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
@@ -0,0 +1,140 @@
+import datetime
+import enum
+import json
+from abc import ABC, abstractmethod
+from flask import has_request_context, request
+from pydantic import BaseModel
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from werkzeug.datastructures import MIMEAccept
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class SwaggerJSONEncoder(json.JSONEncoder):
+    def __init__(
+        self,
+        *,
+        skipkeys: bool = False,
+        ensure_ascii: bool = True,
+        check_circular: bool = True,
+        allow_nan: bool = True,
+        sort_keys: bool = False,
+        indent: Optional[int] = None,
+        separators:  Optional[Tuple[str, str]] = None,
+        default: Callable[..., Any] = None
+    ) -> None:
+        super().__init__(
+            skipkeys=skipkeys,
+            ensure_ascii=ensure_ascii,
+            check_circular=check_circular,
+            allow_nan=allow_nan,
+            sort_keys=sort_keys,
+            indent=indent,
+            separators=separators,
+            default=default,
+        )
+
+    def default(self, o: Any) -> Any:
+        try:
+            if BaseModel.__subclasscheck__(o.__class__):
+                return o.dict()
+            if enum.Enum.__subclasscheck__(o.__class__):
+                return o.value
+            if datetime.datetime.__subclasscheck__(o.__class__):
+                return o.isoformat()
+            if datetime.date.__subclasscheck__(o.__class__):
+                return o.isoformat()
+        finally:
+            try:
+                oo = super().default(o)
+            except:
+                oo = o.__repr__()
+        return oo
+
+
+class Codec(ABC):
+    """
+    Base class of request and response body encoding for a media type
+    """
+    media_type: str = ""
+
+    @abstractmethod
+    def encode(self, obj: Any) -> bytes:
+        pass
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        pass
+
+
+class JSONCodec(Codec):
+    media_type = "application/json"
+
+    def encode(self, obj: Any) -> bytes:
+        return json.dumps(obj, cls=SwaggerJSONEncoder).encode()
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class MessagePackCodec(Codec):
+    """
+    MessagePack binary encoding, available if `msgpack` is installed
+    """
+    media_type = "application/msgpack"
+
+    def __init__(self) -> None:
+        self._encoder = SwaggerJSONEncoder()
+
+    def encode(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, default=self._encoder.default, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+class CodecRegistry():
+    """Available codecs keyed by media type.
+    The first registered codec is the default for the responses
+    """
+    def __init__(self) -> None:
+        self._codecs: Dict[str, Codec] = {}
+
+    def register(self, codec: Codec, *aliases: str) -> None:
+        """
+        Register a codec by its media type and the alias media types
+        """
+        for media_type in (codec.media_type, *aliases):
+            self._codecs[media_type] = codec
+
+    def get(self, media_type: Optional[str]) -> Optional[Codec]:
+        return self._codecs.get(media_type)
+
+    @property
+    def media_types(self) -> List[str]:
+        return [media_type for media_type, codec in self._codecs.items() if codec.media_type == media_type]
+
+    @property
+    def default(self) -> Codec:
+        return next(iter(self._codecs.values()))
+
+    def negotiate(self, accept: Optional[MIMEAccept] = None) -> Codec:
+        """
+        Choose the response codec by the `Accept` header
+        """
+        if accept is None:
+            if not has_request_context():
+                return self.default
+            accept = request.accept_mimetypes
+        if not accept:
+            return self.default
+        return self._codecs[accept.best_match(self.media_types, default=self.default.media_type)]
+
+
+codecs = CodecRegistry()
+codecs.register(JSONCodec())
+if msgpack is not None:
+    codecs.register(MessagePackCodec(), "application/x-msgpack")
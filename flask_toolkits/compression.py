@@ -0,0 +1,152 @@
+import io
+import zlib
+from flask import Request
+from typing import IO, Optional
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge, UnsupportedMediaType
+
+CHUNK_SIZE = 64 * 1024
+
+CONTENT_ENCODINGS = {
+    "gzip": 16 + zlib.MAX_WBITS,
+    "x-gzip": 16 + zlib.MAX_WBITS,
+    "deflate": zlib.MAX_WBITS,
+}
+
+
+class DecompressingStream(io.RawIOBase):
+    """Readable decoded request body, the compressed body is read and inflated in bounded chunks
+    so the decompressed body is never held in memory at once unless it's read at once
+
+    :param stream: compressed request body stream
+    :param encoding: `Content-Encoding` of the body, one of `CONTENT_ENCODINGS`
+    :param max_size: maximum decompressed bytes, `None` is unlimited
+    :param max_ratio: maximum ratio of decompressed to compressed bytes, `None` is unlimited
+    :param ratio_threshold: decompressed bytes before the ratio is checked, small bodies compress too well to judge
+    :param chunk_size: compressed bytes read from `stream` at once
+    """
+    def __init__(
+        self,
+        stream: IO[bytes],
+        encoding: str,
+        max_size: Optional[int] = None,
+        max_ratio: Optional[float] = None,
+        ratio_threshold: int = 1024 * 1024,
+        chunk_size: int = CHUNK_SIZE
+    ) -> None:
+        super().__init__()
+        self.stream = stream
+        self.encoding = encoding
+        self.max_size = max_size
+        self.max_ratio = max_ratio
+        self.ratio_threshold = ratio_threshold
+        self.chunk_size = chunk_size
+        self.compressed_size = 0
+        self.size = 0
+        self._decompressor = zlib.decompressobj(CONTENT_ENCODINGS[encoding])
+        self._pending = b""
+        self._started = False
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _inflate(self, data: bytes, max_length: int) -> bytes:
+        try:
+            chunk = self._decompressor.decompress(data, max_length)
+        except zlib.error as e:
+            if self.encoding == "deflate" and not self._started:
+                # some clients send raw deflate data without the zlib header
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+                self._started = True
+                return self._inflate(data, max_length)
+            raise BadRequest(f"Invalid {self.encoding} request body") from e
+        self._started = True
+        self._pending = self._decompressor.unconsumed_tail
+        self._eof = self._decompressor.eof
+        return chunk
+
+    def _check_limits(self) -> None:
+        if self.max_size is not None and self.size > self.max_size:
+            raise RequestEntityTooLarge(f"Decompressed request body exceeds {self.max_size} bytes")
+        if (
+            self.max_ratio is not None
+            and self.size > self.ratio_threshold
+            and self.size > self.compressed_size * self.max_ratio
+        ):
+            raise RequestEntityTooLarge(f"Request body compression ratio exceeds {self.max_ratio:g}")
+
+    def readinto(self, buffer: bytearray) -> int:
+        if not len(buffer):
+            return 0
+        while not self._eof:
+            data = self._pending
+            if not data:
+                data = self.stream.read(self.chunk_size)
+                self.compressed_size += len(data)
+                if not data:
+                    if self._started:
+                        raise BadRequest(f"Truncated {self.encoding} request body")
+                    # empty body
+                    self._eof = True
+                    break
+            chunk = self._inflate(data, len(buffer))
+            if chunk:
+                self.size += len(chunk)
+                self._check_limits()
+                buffer[:len(chunk)] = chunk
+                return len(chunk)
+        return 0
+
+
+class RequestDecompression():
+    """Decode `Content-Encoding: gzip` or `deflate` request bodies while they're parsed,
+    the JSON, form, multipart and streamed bodies all read the decoded body.
+    Exceeding a cap answers `413 Request Entity Too Large` and other encodings `415 Unsupported Media Type`
+
+    :param max_size: maximum decompressed body bytes, `None` is unlimited
+    :param max_ratio: maximum ratio of decompressed to compressed bytes, it stops zip bombs
+        before `max_size` is reached. `None` is unlimited
+    :param ratio_threshold: decompressed bytes before `max_ratio` is checked
+    :param chunk_size: compressed bytes read at once
+    """
+    def __init__(
+        self,
+        max_size: Optional[int] = 10 * 1024 * 1024,
+        max_ratio: Optional[float] = 100,
+        ratio_threshold: int = 1024 * 1024,
+        chunk_size: int = CHUNK_SIZE
+    ) -> None:
+        self.max_size = max_size
+        self.max_ratio = max_ratio
+        self.ratio_threshold = ratio_threshold
+        self.chunk_size = chunk_size
+
+    def get_encoding(self, req: Request) -> Optional[str]:
+        encodings = [
+            encoding.strip().lower()
+            for encoding in req.headers.get("Content-Encoding", "").split(",")
+            if encoding.strip() and encoding.strip().lower() != "identity"
+        ]
+        if not encodings:
+            return None
+        if len(encodings) > 1 or encodings[0] not in CONTENT_ENCODINGS:
+            raise UnsupportedMediaType(f"Unsupported Content-Encoding '{', '.join(encodings)}'")
+        return encodings[0]
+
+    def apply(self, req: Request) -> None:
+        """
+        Replace the request body stream with its decoding stream, it must be called before the body is read
+        """
+        encoding = self.get_encoding(req)
+        if encoding is None:
+            return
+        stream = req._get_stream_for_parsing()
+        req.__dict__.pop("_cached_data", None)
+        req.__dict__["stream"] = DecompressingStream(
+            stream,
+            encoding,
+            self.max_size,
+            self.max_ratio,
+            self.ratio_threshold,
+            self.chunk_size
+        )
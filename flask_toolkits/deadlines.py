@@ -0,0 +1,85 @@
+import asyncio
+import time
+from flask import Request, g, has_app_context
+from typing import Any, Awaitable, Optional
+
+from .exceptions import DeadlineExceeded
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+
+def run_coroutine(coroutine: Awaitable[Any]) -> Any:
+    """
+    Run the coroutine in a new event loop of the current thread, like `asyncio.run` of python 3.7
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+class Deadline():
+    """Time budget of a request, the request is answered with `504 Gateway Timeout` once it's exceeded
+
+    :param timeout: seconds from now, `None` never expires
+    """
+    def __init__(self, timeout: Optional[float] = None) -> None:
+        self.timeout = timeout
+        self.expires = None if timeout is None else time.monotonic() + timeout
+
+    @classmethod
+    def from_request(cls, req: Request, timeout: Optional[float] = None, header: Optional[str] = DEADLINE_HEADER) -> "Deadline":
+        """
+        Create the deadline of the request from the route `timeout` and the incoming deadline header, whichever is shorter
+        """
+        if header and header in req.headers:
+            try:
+                incoming = float(req.headers[header])
+            except ValueError:
+                incoming = None
+            if incoming is not None and incoming >= 0:
+                timeout = incoming if timeout is None else min(timeout, incoming)
+        return cls(timeout)
+
+    @property
+    def remaining(self) -> Optional[float]:
+        """
+        Seconds left, use it as the timeout of the downstream calls
+        """
+        if self.expires is None:
+            return None
+        return max(self.expires - time.monotonic(), 0)
+
+    @property
+    def expired(self) -> bool:
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def check(self) -> None:
+        if self.expired:
+            raise DeadlineExceeded(f"Request deadline of {self.timeout:g} seconds is exceeded")
+
+    def run(self, coroutine: Awaitable[Any]) -> Any:
+        """
+        Run the coroutine of an async view, it's cancelled once the deadline is exceeded
+        """
+        async def run_with_timeout():
+            try:
+                return await asyncio.wait_for(coroutine, self.remaining)
+            except asyncio.TimeoutError as e:
+                raise DeadlineExceeded(f"Request deadline of {self.timeout:g} seconds is exceeded") from e
+        if self.expired:
+            coroutine.close()
+            self.check()
+        return run_coroutine(run_with_timeout())
+
+
+def get_deadline() -> Deadline:
+    """Get the deadline of the current request
+
+    - example : `def view(deadline: Deadline = Depends(get_deadline))`
+    """
+    if has_app_context() and "deadline" in g:
+        return g.deadline
+    return Deadline()
@@ -1,4 +1,8 @@
-from typing import Any, Callable, Optional
+import inspect
+from typing import Any, Callable, Dict, List, Optional
+
+from .background import BackgroundTasks
+from .deadlines import Deadline
 
 
 class Depends():
@@ -9,4 +13,66 @@ class Depends():
         self.obj = obj
     
     def __repr__(self) -> str:
-        return f"{self.obj.__module__}.{self.obj.__name__} dependency"
\ No newline at end of file
+        return f"{self.obj.__module__}.{self.obj.__name__} dependency"
+
+
+class DependencyResolver():
+    """Call a function with its own arguments taken from the validated kwargs,
+    its `Depends` arguments are resolved by calling the dependencies first
+    and its `BackgroundTasks` arguments receive the tasks of the request
+
+    :param func: view function or dependency
+    """
+    def __init__(self, func: Callable[..., Any]) -> None:
+        self.func = func
+        self.names: List[str] = []
+        self.accepts_any = False
+        self.dependencies: Dict[str, "DependencyResolver"] = {}
+        self.background_tasks: List[str] = []
+        for name, param in inspect.signature(func).parameters.items():
+            if param.kind == inspect.Parameter.VAR_KEYWORD:
+                self.accepts_any = True
+            elif param.annotation is BackgroundTasks:
+                self.background_tasks.append(name)
+            elif isinstance(param.default, Depends):
+                if callable(param.default.obj):
+                    self.dependencies[name] = DependencyResolver(param.default.obj)
+            elif param.kind != inspect.Parameter.VAR_POSITIONAL:
+                self.names.append(name)
+
+    @property
+    def uses_background_tasks(self) -> bool:
+        return bool(self.background_tasks) or any(d.uses_background_tasks for d in self.dependencies.values())
+
+    def resolve(
+        self,
+        kwargs: Dict[str, Any],
+        deadline: Optional[Deadline] = None,
+        tasks: Optional[BackgroundTasks] = None
+    ) -> Dict[str, Any]:
+        """
+        Get the keyword arguments of the function, the deadline is checked before every dependency call
+        """
+        if self.accepts_any:
+            resolved = dict(kwargs)
+        else:
+            resolved = {k: kwargs[k] for k in self.names if k in kwargs}
+        for name in self.background_tasks:
+            resolved[name] = BackgroundTasks() if tasks is None else tasks
+        for name, dependency in self.dependencies.items():
+            resolved[name] = dependency(kwargs, deadline, tasks)
+        return resolved
+
+    def __call__(
+        self,
+        kwargs: Dict[str, Any],
+        deadline: Optional[Deadline] = None,
+        tasks: Optional[BackgroundTasks] = None
+    ) -> Any:
+        if deadline:
+            deadline.check()
+        resolved = self.resolve(kwargs, deadline, tasks)
+        if deadline and self.dependencies:
+            # the dependencies may have used up the budget
+            deadline.check()
+        return self.func(**resolved)
@@ -1,3 +1,11 @@
 class SwaggerPathError(Exception):
     def __init__(self, *args: object) -> None:
-        super().__init__(*args)
\ No newline at end of file
+        super().__init__(*args)
+
+class DeadlineExceeded(Exception):
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+class BodyLimitExceeded(Exception):
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
@@ -0,0 +1,104 @@
+import inspect
+import os
+import pickle
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+from .deadlines import Deadline
+from .exceptions import DeadlineExceeded
+
+
+def default_max_workers() -> int:
+    """
+    Processes of each web server worker, the CPUs are split between the `WEB_CONCURRENCY` workers
+    """
+    try:
+        workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    except ValueError:
+        workers = 1
+    return max((os.cpu_count() or 1) // max(workers, 1), 1)
+
+
+def check_picklable(func: Callable[..., Any]) -> None:
+    """
+    Check at decoration time that the view function and its parameter types can be sent to another process
+    """
+    if inspect.iscoroutinefunction(func):
+        raise TypeError(f"'{func.__qualname__}' is async, it can't run in a process executor")
+    if "<" in func.__qualname__:
+        raise TypeError(f"'{func.__qualname__}' must be a module-level function to run in a process executor")
+    for name, annot in getattr(func, "__annotations__", {}).items():
+        try:
+            pickle.dumps(annot)
+        except Exception as e:
+            raise TypeError(
+                f"'{func.__qualname__}' parameter '{name}' type can't be pickled to run in a process executor"
+            ) from e
+
+
+def _warm_up() -> int:
+    # keep the process busy for a moment so every process of the pool is started
+    time.sleep(0.05)
+    return os.getpid()
+
+
+class ProcessExecutor():
+    """Per-worker managed process pool for CPU-bound view functions that hold the GIL,
+    the pool is created again in a forked web server worker so every worker has its own
+
+    :param max_workers: processes of the pool, default splits the CPUs between the `WEB_CONCURRENCY` workers
+    :param mp_context: `multiprocessing` context of the processes
+    :param warm_up: start all processes when the router is registered to the app
+    """
+    def __init__(self, max_workers: Optional[int] = None, mp_context: Any = None, warm_up: bool = True) -> None:
+        self.max_workers = max_workers or default_max_workers()
+        self.mp_context = mp_context
+        self.warm_up = warm_up
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None or self._pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pid != os.getpid():
+                    # `mp_context` needs python 3.7
+                    options = {"mp_context": self.mp_context} if self.mp_context is not None else {}
+                    self._pool = ProcessPoolExecutor(self.max_workers, **options)
+                    self._pid = os.getpid()
+        return self._pool
+
+    def warm(self) -> None:
+        """
+        Start all processes of the pool so the first requests don't wait for them
+        """
+        futures = [self.pool.submit(_warm_up) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+
+    def run(self, func: Callable[..., Any], kwargs: Dict[str, Any], deadline: Optional[Deadline] = None) -> Any:
+        """
+        Run the function with the resolved kwargs in the pool and wait for its result until the deadline,
+        a function that already started keeps its process busy until it returns
+        """
+        if deadline:
+            deadline.check()
+        future = self.pool.submit(func, **kwargs)
+        try:
+            return future.result(timeout=deadline.remaining if deadline else None)
+        except FutureTimeoutError as e:
+            future.cancel()
+            raise DeadlineExceeded(f"Request deadline of {deadline.timeout:g} seconds is exceeded") from e
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                if sys.version_info >= (3, 9):
+                    self._pool.shutdown(wait=wait, cancel_futures=True)
+                else:
+                    self._pool.shutdown(wait=wait)
+            self._pool = None
@@ -202,6 +202,8 @@ class Query(BaseParams):
     :param example: swagger request example
     :param examples:
     :param deprecated: swagger deprecated status
+    :param explode: for `List[...]` or `Set[...]` query, `True` takes the repeated keys (`?tag=a&tag=b`)
+        and `False` splits the comma-separated values (`?tag=a,b`)
     """
     def __init__(
         self,
@@ -220,6 +222,7 @@ class Query(BaseParams):
         example: Any = None,
         examples: Optional[Dict[str, Any]] = None,
         deprecated: Optional[bool] = None,
+        explode: bool = True,
         **extra: Any
     ) -> None:
         super().__init__(
@@ -240,6 +243,12 @@ class Query(BaseParams):
             _type = _request_param_type.query,
             **extra
         )
+        self.explode = explode
+
+    def copy(self):
+        copied = super().copy()
+        copied.explode = self.explode
+        return copied
 
 
 class Path(BaseParams):
@@ -317,6 +326,10 @@ class Body(BaseParams):
     :param examples:
     :param deprecated: swagger deprecated status
     :param pydantic_model: pydantic model that represent the body schema
+    :param stream: for `List[...]` body, decode and validate the items while the request body is read
+        and pass them as a generator, the validation error is raised when the invalid item is reached.
+        `application/x-ndjson` request body is also accepted, one item per line
+    :param batch_size: for streamed body, validate the items in batches and pass a generator of the batches
     """
     def __init__(
         self,
@@ -336,6 +349,8 @@ class Body(BaseParams):
         examples: Optional[Dict[str, Any]] = None,
         deprecated: Optional[bool] = None,
         pydantic_model: BaseModel = None,
+        stream: bool = False,
+        batch_size: Optional[int] = None,
         **extra: Any
     ) -> None:
         super().__init__(
@@ -357,6 +372,14 @@ class Body(BaseParams):
             **extra
         )
         self.pydantic_model = pydantic_model
+        self.stream = stream or bool(batch_size)
+        self.batch_size = batch_size
+
+    def copy(self):
+        copied = super().copy()
+        copied.stream = self.stream
+        copied.batch_size = self.batch_size
+        return copied
 
 
 class Form(BaseParams):
@@ -490,6 +513,11 @@ class File(BaseParams):
     :param example: swagger request example
     :param examples:
     :param deprecated: swagger deprecated status
+    :param max_size: maximum bytes of the uploaded file, the request is rejected with `413 Request Entity Too Large`
+        as soon as the upload exceeds it
+    :param spool_threshold: the uploaded file is kept in memory up to this many bytes and spooled to
+        a temporary file beyond it
+    :param hash: `hashlib` algorithm name of the uploaded file digest, computed while it's received
     """
     def __init__(
         self,
@@ -508,6 +536,9 @@ class File(BaseParams):
         example: Any = None,
         examples: Optional[Dict[str, Any]] = None,
         deprecated: Optional[bool] = None,
+        max_size: Optional[int] = None,
+        spool_threshold: int = 1024 * 1024,
+        hash: Optional[str] = None,
         **extra: Any
     ) -> None:
         super().__init__(
@@ -527,4 +558,14 @@ class File(BaseParams):
             deprecated=deprecated,
             _type = _request_param_type.file,
             **extra
-        )
\ No newline at end of file
+        )
+        self.max_size = max_size
+        self.spool_threshold = spool_threshold
+        self.hash = hash
+
+    def copy(self):
+        copied = super().copy()
+        copied.max_size = self.max_size
+        copied.spool_threshold = self.spool_threshold
+        copied.hash = self.hash
+        return copied
@@ -0,0 +1,291 @@
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from flask import Request
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from werkzeug.wrappers.response import Response as ResponseBase
+
+from .caching import SQLiteConnectionMixin, principal_identity, request_key
+from .responses import JSONResponse, generate_etag
+
+IDEMPOTENT_METHODS = ["POST", "PUT", "PATCH"]
+
+
+class IdempotencyRecord():
+    """Stored first response of an idempotency key,
+    `status_code` is `None` while the first request is still in progress
+    """
+    __slots__ = ("fingerprint", "status_code", "headers", "body", "expires")
+
+    def __init__(
+        self,
+        fingerprint: str,
+        status_code: Optional[int] = None,
+        headers: Optional[List[Tuple[str, str]]] = None,
+        body: bytes = b"",
+        expires: float = 0
+    ) -> None:
+        self.fingerprint = fingerprint
+        self.status_code = status_code
+        self.headers = headers or []
+        self.body = body
+        self.expires = expires
+
+    @property
+    def in_progress(self) -> bool:
+        return self.status_code is None
+
+    def to_response(self) -> ResponseBase:
+        response = ResponseBase(self.body, status=self.status_code, headers=self.headers)
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+
+
+class IdempotencyStore(ABC):
+    """
+    Base class of idempotency records storage
+    """
+    @abstractmethod
+    def reserve(self, key: str, fingerprint: str, lock_ttl: float) -> Optional[IdempotencyRecord]:
+        """Atomically take the key for a new request
+
+        :return: `None` if the key is taken by the caller, otherwise the existing record
+        """
+        pass
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[IdempotencyRecord]:
+        pass
+
+    @abstractmethod
+    def complete(self, key: str, record: IdempotencyRecord) -> None:
+        pass
+
+    @abstractmethod
+    def release(self, key: str) -> None:
+        """
+        Drop the in-progress record so the request can be retried
+        """
+        pass
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    """In-process LRU idempotency records storage
+
+    :param max_entries: maximum stored records, the least recently used is evicted first
+    """
+    def __init__(self, max_entries: int = 10000) -> None:
+        self.max_entries = max_entries
+        self._records: "OrderedDict[str, IdempotencyRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, fingerprint: str, lock_ttl: float) -> Optional[IdempotencyRecord]:
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None and record.expires > time.time():
+                self._records.move_to_end(key)
+                return record
+            self._records[key] = IdempotencyRecord(fingerprint, expires=time.time() + lock_ttl)
+            self._records.move_to_end(key)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+        return None
+
+    def get(self, key: str) -> Optional[IdempotencyRecord]:
+        with self._lock:
+            record = self._records.get(key)
+            if record is None or record.expires <= time.time():
+                return None
+            return record
+
+    def complete(self, key: str, record: IdempotencyRecord) -> None:
+        with self._lock:
+            self._records[key] = record
+            self._records.move_to_end(key)
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None and record.in_progress:
+                del self._records[key]
+
+
+class SQLiteIdempotencyStore(SQLiteConnectionMixin, IdempotencyStore):
+    """SQLite idempotency records storage, shared by all workers that point to the same database file
+
+    :param path: database file path
+    :param timeout: database lock timeout in seconds
+    """
+    isolation_level = None
+
+    def __init__(self, path: str, timeout: float = 5.0) -> None:
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS idempotency_records "
+            "(key TEXT PRIMARY KEY, fingerprint TEXT, status INTEGER, headers TEXT, body BLOB, expires REAL)"
+        )
+
+    def _select(self, conn: sqlite3.Connection, key: str) -> Optional[IdempotencyRecord]:
+        row = conn.execute(
+            "SELECT fingerprint, status, headers, body, expires FROM idempotency_records WHERE key = ? AND expires > ?",
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        fingerprint, status, headers, body, expires = row
+        return IdempotencyRecord(fingerprint, status, [tuple(h) for h in json.loads(headers)], body, expires)
+
+    def reserve(self, key: str, fingerprint: str, lock_ttl: float) -> Optional[IdempotencyRecord]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            record = self._select(conn, key)
+            if record is None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO idempotency_records VALUES (?, ?, NULL, '[]', x'', ?)",
+                    (key, fingerprint, time.time() + lock_ttl)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return record
+
+    def get(self, key: str) -> Optional[IdempotencyRecord]:
+        return self._select(self._connection(), key)
+
+    def complete(self, key: str, record: IdempotencyRecord) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO idempotency_records VALUES (?, ?, ?, ?, ?, ?)",
+            (key, record.fingerprint, record.status_code, json.dumps(record.headers), record.body, record.expires)
+        )
+
+    def release(self, key: str) -> None:
+        self._connection().execute("DELETE FROM idempotency_records WHERE key = ? AND status IS NULL", (key,))
+
+
+class Idempotency():
+    """Replay the first response of a request for its retries with the same `Idempotency-Key` header
+
+    :param ttl: seconds the first response is kept for the retries
+    :param store: idempotency records storage, use `SQLiteIdempotencyStore` to share them between workers
+    :param header: request header of the idempotency key
+    :param required: answer `400 Bad Request` if the request doesn't have the idempotency key
+    :param wait_timeout: seconds a concurrent duplicate request waits for the first one
+        before it's answered with `409 Conflict`
+    :param lock_ttl: seconds an in-progress key stays taken if its worker never completes it
+    """
+    def __init__(
+        self,
+        ttl: float = 86400,
+        store: Optional[IdempotencyStore] = None,
+        header: str = "Idempotency-Key",
+        required: bool = False,
+        wait_timeout: float = 30,
+        lock_ttl: float = 300
+    ) -> None:
+        self.ttl = ttl
+        self.store = store or MemoryIdempotencyStore()
+        self.header = header
+        self.required = required
+        self.wait_timeout = wait_timeout
+        self.lock_ttl = lock_ttl
+        self._events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, prefix: str, idempotency_key: str, principal: Any = None) -> str:
+        return request_key(prefix, {}, principal_identity(principal), idempotency_key)
+
+    @staticmethod
+    def fingerprint(req: Request, with_body: bool = True) -> str:
+        """Digest of the request method, path, query and body to detect a reused key with a different request
+
+        :param with_body: digest the body, otherwise its `Content-Length` and `Content-Type`
+            so a streamed body isn't read into memory before the view function
+        """
+        if not with_body:
+            return generate_etag(f"{req.method} {req.full_path}\n{req.content_length} {req.content_type}".encode())
+        return generate_etag(f"{req.method} {req.full_path}\n".encode() + req.get_data())
+
+    def is_storable(self, response: ResponseBase) -> bool:
+        return not response.is_streamed and response.status_code < 500 and response.status_code not in [409, 429]
+
+    def error(self, detail: str, status_code: int) -> JSONResponse:
+        return JSONResponse(response={"detail": detail}, status_code=status_code)
+
+    def handle(
+        self,
+        req: Request,
+        prefix: str,
+        principal: Any,
+        compute: Callable[[], ResponseBase],
+        with_body: bool = True
+    ) -> ResponseBase:
+        """Answer the request by its idempotency key, `compute` is only called for the first request of the key
+
+        :param with_body: digest the body in the request fingerprint, `False` for streamed bodies and file uploads
+        """
+        idempotency_key = req.headers.get(self.header)
+        if not idempotency_key:
+            if self.required:
+                return self.error(f"Missing {self.header} header", 400)
+            return compute()
+
+        key = self.make_key(prefix, idempotency_key, principal)
+        fingerprint = self.fingerprint(req, with_body)
+        while True:
+            with self._lock:
+                record = self.store.reserve(key, fingerprint, self.lock_ttl)
+                if record is None:
+                    self._events[key] = threading.Event()
+                    break
+            if record.in_progress:
+                record = self.wait(key)
+                if record is None:
+                    # the first request failed, take the key over
+                    continue
+            if record.fingerprint != fingerprint:
+                return self.error(f"{self.header} is already used by a different request", 422)
+            if record.in_progress:
+                return self.error(f"A request with the same {self.header} is still in progress", 409)
+            return record.to_response()
+
+        try:
+            response = compute()
+            if self.is_storable(response):
+                self.store.complete(key, IdempotencyRecord(
+                    fingerprint,
+                    response.status_code,
+                    list(response.headers.items()),
+                    response.get_data(),
+                    time.time() + self.ttl
+                ))
+            else:
+                self.store.release(key)
+            return response
+        except Exception:
+            self.store.release(key)
+            raise
+        finally:
+            with self._lock:
+                event = self._events.pop(key)
+            event.set()
+
+    def wait(self, key: str) -> Optional[IdempotencyRecord]:
+        """
+        Wait for the in-progress request of the key, from this worker or another one sharing the store
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        event = self._events.get(key)
+        if event is not None:
+            event.wait(self.wait_timeout)
+        record = self.store.get(key)
+        while record is not None and record.in_progress and time.monotonic() < deadline:
+            time.sleep(0.05)
+            record = self.store.get(key)
+        return record
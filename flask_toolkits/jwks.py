@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from jose import jwk, jwt
+from jose.exceptions import JWTError
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+_default_algorithms = {
+    "RSA": "RS256",
+    "oct": "HS256",
+    "P-256": "ES256",
+    "P-384": "ES384",
+    "P-521": "ES512",
+}
+
+
+class JWKSKeyProvider():
+    """JSON Web Key Set provider that keeps the parsed keys indexed by `kid`
+
+    :param source: JWKS file path, or a function that returns the JWKS (`dict` or JSON `str`)
+    :param refresh_interval: seconds between background refreshes, set `0` to disable it
+    :param min_refresh_interval: minimum seconds between refetches caused by unknown `kid`
+
+    use it with `HTTPBearerSecurity(key_provider=...)` or `self.get_signing_key(token)`
+    """
+    def __init__(
+        self,
+        source: Union[str, Callable[[], Union[str, Dict[str, Any]]]],
+        refresh_interval: float = 3600,
+        min_refresh_interval: float = 30
+    ) -> None:
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: Dict[str, Tuple[Any, str]] = {}
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def fetch(self) -> Dict[str, Any]:
+        if callable(self.source):
+            jwks = self.source()
+        else:
+            with open(self.source) as f:
+                jwks = f.read()
+        if isinstance(jwks, (str, bytes)):
+            jwks = json.loads(jwks)
+        return jwks
+
+    def refresh(self) -> None:
+        """
+        Fetch the key set and replace the parsed keys
+        """
+        keys = {}
+        for key_data in self.fetch().get("keys", []):
+            if key_data.get("use", "sig") != "sig":
+                continue
+            algorithm = key_data.get("alg") or _default_algorithms.get(key_data.get("crv", key_data.get("kty")))
+            if not algorithm:
+                continue
+            keys[key_data.get("kid")] = (jwk.construct(key_data, algorithm), algorithm)
+        self._keys = keys
+        self._last_refresh = time.monotonic()
+
+    def get_key(self, kid: Optional[str]) -> Tuple[Any, str]:
+        """Get parsed key and its algorithm by `kid`,
+        the key set is refetched once (rate limited) if the `kid` is unknown
+        """
+        self.start()
+        key = self._keys.get(kid)
+        if key is None:
+            with self._lock:
+                key = self._keys.get(kid)
+                if key is None and time.monotonic() - self._last_refresh >= self.min_refresh_interval:
+                    self.refresh()
+                    key = self._keys.get(kid)
+        if key is None:
+            raise JWTError(f"Unknown signing key: {kid}")
+        return key
+
+    def get_signing_key(self, token: str) -> Tuple[Any, str]:
+        """
+        Get parsed key and its algorithm for the token's `kid` header
+        """
+        return self.get_key(jwt.get_unverified_header(token).get("kid"))
+
+    def start(self) -> None:
+        """
+        Load the key set and start the background refresh
+        """
+        if self._last_refresh and (self._thread is not None or not self.refresh_interval):
+            return
+        with self._lock:
+            if not self._last_refresh:
+                self.refresh()
+            if self.refresh_interval and self._thread is None:
+                self._thread = threading.Thread(target=self._refresh_periodically, daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _refresh_periodically(self) -> None:
+        while not self._stopped.wait(self.refresh_interval):
+            try:
+                with self._lock:
+                    self.refresh()
+            except Exception:
+                # keep serving the previous keys until the next refresh
+                continue
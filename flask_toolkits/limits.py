@@ -0,0 +1,156 @@
+import io
+import re
+from flask import Request
+from typing import IO, Any, Dict, Iterator, List, Optional
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from .exceptions import BodyLimitExceeded
+
+# strings are matched whole so the brackets, commas and colons inside them are skipped
+_JSON_STRUCTURE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{},:]')
+
+
+class BoundedStream(io.RawIOBase):
+    """Readable request body that answers `413 Request Entity Too Large` once more than `max_bytes` are read
+
+    :param stream: request body stream
+    :param max_bytes: maximum body bytes
+    """
+    def __init__(self, stream: IO[bytes], max_bytes: int) -> None:
+        super().__init__()
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.size = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: bytearray) -> int:
+        data = self.stream.read(min(len(buffer), self.max_bytes - self.size + 1))
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise RequestEntityTooLarge(f"Request body exceeds {self.max_bytes} bytes")
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class BodyLimits():
+    """Limits of the request body, they're enforced while the body is read and decoded
+    so a pathological payload is rejected before any pydantic model is constructed
+
+    :param max_bytes: maximum body bytes (after `Content-Encoding` decoding), answers `413 Request Entity Too Large`
+    :param max_depth: maximum nesting depth of the arrays and objects, answers `422 Unprocessable Entity`
+    :param max_array_length: maximum items of each array, answers `422 Unprocessable Entity`
+    :param max_keys: maximum keys of each object, answers `422 Unprocessable Entity`
+    """
+    fields = ("max_bytes", "max_depth", "max_array_length", "max_keys")
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_depth: Optional[int] = None,
+        max_array_length: Optional[int] = None,
+        max_keys: Optional[int] = None
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_depth = max_depth
+        self.max_array_length = max_array_length
+        self.max_keys = max_keys
+
+    def override(self, limits: Optional["BodyLimits"]) -> "BodyLimits":
+        """
+        Merge the endpoint's limits into the router's, the limits the endpoint sets take precedence
+        """
+        if limits is None:
+            return self
+        return BodyLimits(**{
+            name: getattr(self, name) if getattr(limits, name) is None else getattr(limits, name)
+            for name in self.fields
+        })
+
+    def to_dict(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.fields if getattr(self, name) is not None}
+
+    @property
+    def has_structure_limits(self) -> bool:
+        return self.max_depth is not None or self.max_array_length is not None or self.max_keys is not None
+
+    def apply(self, req: Request) -> None:
+        """
+        Reject the request by its `Content-Length` and bound its body stream, it must be called before the body is read
+        """
+        if self.max_bytes is None:
+            return
+        if req.content_length is not None and req.content_length > self.max_bytes and not req.headers.get("Content-Encoding"):
+            raise RequestEntityTooLarge(f"Request body exceeds {self.max_bytes} bytes")
+        stream = req._get_stream_for_parsing()
+        req.__dict__.pop("_cached_data", None)
+        req.__dict__["stream"] = BoundedStream(stream, self.max_bytes)
+
+    def scan_json(self, data: bytes) -> None:
+        """
+        Check the structure of a JSON document from its brackets, commas and colons without decoding it
+        """
+        if not self.has_structure_limits:
+            return
+        # [opening bracket, commas or colons, end of the opening bracket]
+        stack: List[List[Any]] = []
+        for match in _JSON_STRUCTURE.finditer(data):
+            token = match.group()
+            if token == b"[" or token == b"{":
+                if self.max_depth is not None and len(stack) >= self.max_depth:
+                    raise BodyLimitExceeded(f"nesting depth exceeds {self.max_depth}")
+                stack.append([token, 0, match.end()])
+            elif token == b"]" or token == b"}":
+                if not stack:
+                    continue
+                bracket, count, start = stack.pop()
+                if bracket == b"[" and self.max_array_length == 0 and data[start:match.start()].strip():
+                    raise BodyLimitExceeded("array length exceeds 0")
+            elif token == b"," and stack and stack[-1][0] == b"[":
+                stack[-1][1] += 1
+                if self.max_array_length is not None and stack[-1][1] >= self.max_array_length:
+                    raise BodyLimitExceeded(f"array length exceeds {self.max_array_length}")
+            elif token == b":" and stack and stack[-1][0] == b"{":
+                stack[-1][1] += 1
+                if self.max_keys is not None and stack[-1][1] > self.max_keys:
+                    raise BodyLimitExceeded(f"object keys exceed {self.max_keys}")
+
+    def check(self, obj: Any, depth: int = 0) -> None:
+        """
+        Check the structure of an already decoded body, for the codecs that can't be scanned
+        """
+        if not self.has_structure_limits or not isinstance(obj, (dict, list)):
+            return
+        if self.max_depth is not None and depth >= self.max_depth:
+            raise BodyLimitExceeded(f"nesting depth exceeds {self.max_depth}")
+        if isinstance(obj, dict):
+            if self.max_keys is not None and len(obj) > self.max_keys:
+                raise BodyLimitExceeded(f"object keys exceed {self.max_keys}")
+            values = obj.values()
+        else:
+            if self.max_array_length is not None and len(obj) > self.max_array_length:
+                raise BodyLimitExceeded(f"array length exceeds {self.max_array_length}")
+            values = obj
+        for value in values:
+            self.check(value, depth + 1)
+
+    def iter_checked(self, items: Iterator[Any]) -> Iterator[Any]:
+        """
+        Check the items of a streamed body array while they're decoded
+        """
+        for index, item in enumerate(items):
+            if self.max_array_length is not None and index >= self.max_array_length:
+                raise BodyLimitExceeded(f"array length exceeds {self.max_array_length}")
+            self.check(item, depth=1)
+            yield item
+
+
+def body_limit_errors(e: BodyLimitExceeded) -> List[Dict[str, Any]]:
+    return [
+        {
+            "loc": ["body"],
+            "msg": f"request body {e}",
+            "type": "value_error.body_limits"
+        }
+    ]
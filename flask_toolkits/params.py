@@ -8,6 +8,20 @@ ParamsType = Union[Path, Header, Query, Body, Form, FormURLEncoded, File]
 _BodyClasses = (Body, Form, FormURLEncoded, File)
 _FormClasses = (Form, FormURLEncoded, File)
 FormType = Union[Form, FormURLEncoded, File]
+_MultiValueTypes = (list, set, frozenset, tuple)
+
+
+def is_multi_value(annot: Any) -> bool:
+    """
+    Whether the annotation takes multiple values, ex: `List[str]`, `Set[int]` or `Optional[List[str]]`
+    """
+    if annot in _MultiValueTypes:
+        return True
+    origin = getattr(annot, "__origin__", None)
+    if origin is Union:
+        return any(is_multi_value(arg) for arg in getattr(annot, "__args__", ()) if arg is not type(None))
+    # python 3.6 origin is the generic alias, ex: `typing.List`
+    return getattr(origin, "__extra__", origin) in _MultiValueTypes
 
 class ParamSignature():
     def __init__(
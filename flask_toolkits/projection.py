@@ -0,0 +1,97 @@
+from flask import g, has_app_context
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional, Type, Union
+
+FIELDS_PARAM = "fields"
+
+Projection = Dict[str, Union["Projection", Any]]
+
+
+def parse_fields(value: str) -> Projection:
+    """Parse `fields` query parameter into projection tree
+
+    - example : "id,owner.name,owner.email" -> {"id": ..., "owner": {"name": ..., "email": ...}}
+    """
+    projection = {}
+    for path in value.split(","):
+        parts = path.strip().split(".")
+        if parts == [""]:
+            continue
+        node = projection
+        for part in parts[:-1]:
+            if node.get(part) is ...:
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = ...
+    return projection
+
+
+def validate_fields(
+    projection: Projection,
+    model: Optional[Type[BaseModel]],
+    prefix: str = ""
+) -> List[str]:
+    """
+    Get the requested field paths that are not defined in the response model
+    """
+    if model is None:
+        return []
+    invalid = []
+    for name, sub in projection.items():
+        path = prefix + name
+        field = model.__fields__.get(name)
+        if field is None:
+            invalid.append(path)
+            continue
+        if sub is not ...:
+            submodel = field.type_ if isinstance(field.type_, type) and issubclass(field.type_, BaseModel) else None
+            if submodel is None:
+                invalid.extend(path + "." + p for p in _flatten(sub))
+            else:
+                invalid.extend(validate_fields(sub, submodel, path + "."))
+    return invalid
+
+
+def _flatten(projection: Projection) -> List[str]:
+    paths = []
+    for name, sub in projection.items():
+        if sub is ...:
+            paths.append(name)
+        else:
+            paths.extend(name + "." + p for p in _flatten(sub))
+    return paths
+
+
+def fields_errors(invalid: List[str]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "loc": ["query", FIELDS_PARAM],
+            "msg": f"unknown field '{path}'",
+            "type": "value_error.fields"
+        }
+        for path in invalid
+    ]
+
+
+def project_fields(obj: Any, projection: Union[Projection, Any]) -> Any:
+    """
+    Keep only the projected fields, the rest are never converted
+    """
+    if projection is ...:
+        return obj
+    if isinstance(obj, BaseModel):
+        return {k: project_fields(getattr(obj, k), projection[k]) for k in obj.__fields__ if k in projection}
+    if isinstance(obj, dict):
+        return {k: project_fields(v, projection[k]) for k, v in obj.items() if k in projection}
+    if isinstance(obj, (list, tuple)):
+        return [project_fields(o, projection) for o in obj]
+    return obj
+
+
+def get_fields_projection() -> Optional[Projection]:
+    """
+    Get the projection of the current request
+    """
+    if has_app_context():
+        return g.get("sparse_fields")
@@ -0,0 +1,141 @@
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from flask import Request
+from typing import Any, Callable, Optional, Tuple, Union
+
+from .caching import SQLiteConnectionMixin, principal_identity, request_key
+
+
+class RateLimitStore(ABC):
+    """
+    Base class of token buckets storage
+    """
+    @abstractmethod
+    def consume(self, key: str, capacity: float, rate: float, cost: float = 1) -> Tuple[bool, float, float]:
+        """Take tokens from the bucket
+
+        :param key: bucket key
+        :param capacity: maximum tokens of the bucket
+        :param rate: refilled tokens per second
+        :param cost: tokens taken by the request
+        :return: (allowed, remaining tokens, seconds until the request would be allowed)
+        """
+        pass
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """In-process token buckets
+
+    :param max_keys: maximum tracked buckets, the least recently used is evicted first
+    """
+    def __init__(self, max_keys: int = 100000) -> None:
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: float, rate: float, cost: float = 1) -> Tuple[bool, float, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens, 0 if allowed else (cost - tokens) / rate
+
+
+class SQLiteRateLimitStore(SQLiteConnectionMixin, RateLimitStore):
+    """SQLite token buckets, shared by all workers that point to the same database file
+    (put it on a memory filesystem like `/dev/shm` to keep it fast)
+
+    :param path: database file path
+    :param timeout: database lock timeout in seconds
+    """
+    isolation_level = None
+
+    def __init__(self, path: str, timeout: float = 5.0) -> None:
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+        )
+
+    def consume(self, key: str, capacity: float, rate: float, cost: float = 1) -> Tuple[bool, float, float]:
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + max(now - updated, 0) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute("INSERT OR REPLACE INTO rate_limit_buckets VALUES (?, ?, ?)", (key, tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, tokens, 0 if allowed else (cost - tokens) / rate
+
+
+class RateLimit():
+    """Token bucket rate limit of the requests
+
+    :param limit: allowed requests in a `period`
+    :param period: seconds of the `period`
+    :param burst: maximum requests at once, default is `limit`
+    :param key: bucket of the request, `"principal"` (falls back to client IP without security principal),
+        `"ip"` or a function that receives the request and returns the key
+    :param name: bucket namespace, requests of endpoints with the same `name` are counted together.
+        default is the router or the endpoint where it's defined
+    :param store: token bucket storage, use `SQLiteRateLimitStore` to share the limit between workers
+    """
+    def __init__(
+        self,
+        limit: int,
+        period: float = 60,
+        burst: Optional[int] = None,
+        key: Union[str, Callable[[Request], Any]] = "principal",
+        name: Optional[str] = None,
+        store: Optional[RateLimitStore] = None
+    ) -> None:
+        self.limit = limit
+        self.period = period
+        self.burst = burst or limit
+        self.key = key
+        self.name = name
+        self.store = store or MemoryRateLimitStore()
+
+    @property
+    def rate(self) -> float:
+        return self.limit / self.period
+
+    @property
+    def description(self) -> str:
+        key = self.key if isinstance(self.key, str) else "client"
+        return f"{self.limit} requests per {self.period:g} seconds per {key}"
+
+    def get_key(self, req: Request, principal: Any = None) -> str:
+        if callable(self.key):
+            identity = self.key(req)
+        elif self.key == "principal" and principal is not None:
+            identity = principal_identity(principal)
+        else:
+            identity = req.remote_addr
+        return request_key(self.name or "", {}, identity)
+
+    def hit(self, req: Request, principal: Any = None) -> Tuple[bool, int]:
+        """
+        Take a token for the request, return whether it's allowed and the `Retry-After` seconds
+        """
+        allowed, _, retry_after = self.store.consume(self.get_key(req, principal), self.burst, self.rate)
+        return allowed, math.ceil(retry_after)
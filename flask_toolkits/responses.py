@@ -1,55 +1,68 @@
-import datetime
-import enum
-import json
-from pydantic import BaseModel
-from typing import Any, Callable, Iterable, Mapping, Optional, Tuple, Union
+import hashlib
+from typing import Any, Iterable, Mapping, Optional, Tuple, Union
 from werkzeug.wrappers.response import Response as ResponseBase
 
+from .codec import Codec, JSONCodec, SwaggerJSONEncoder, codecs
+from .projection import get_fields_projection, project_fields
 from .schemas import response_json_example
 
-class SwaggerJSONEncoder(json.JSONEncoder):
+def generate_etag(data: bytes) -> str:
+    """
+    Hash the response body into an entity tag
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class EncodedResponse(ResponseBase):
+    """Response that is encoded by a `Codec`
+
+    :param etag: set `ETag` header from the hash of encoded body
+    :param weak_etag: mark the `ETag` as a weak validator
+    :param codec: body codec, if `None` it's negotiated from the `Accept` request header
+
+    Successful response is pruned to the requested `fields` of sparse fieldsets endpoint
+    """
+    codec: Optional[Codec] = None
+
     def __init__(
         self,
-        *,
-        skipkeys: bool = False,
-        ensure_ascii: bool = True,
-        check_circular: bool = True,
-        allow_nan: bool = True,
-        sort_keys: bool = False,
-        indent: Optional[int] = None,
-        separators:  Optional[Tuple[str, str]] = None,
-        default: Callable[..., Any] = None
+        response: Any = None,
+        status_code: Optional[int] = None,
+        headers: Optional[
+            Union[Mapping[str, Union[str, int, Iterable[Union[str, int]]]],
+            Iterable[Tuple[str, Union[str, int]]]]
+        ] = None,
+        etag: bool = False,
+        weak_etag: bool = False,
+        codec: Optional[Codec] = None
     ) -> None:
-        super().__init__(
-            skipkeys=skipkeys,
-            ensure_ascii=ensure_ascii,
-            check_circular=check_circular,
-            allow_nan=allow_nan,
-            sort_keys=sort_keys,
-            indent=indent,
-            separators=separators,
-            default=default,
-        )
-
-    def default(self, o: Any) -> Any:
-        try:
-            if BaseModel.__subclasscheck__(o.__class__):
-                return o.dict()
-            if enum.Enum.__subclasscheck__(o.__class__):
-                return o.value
-            if datetime.datetime.__subclasscheck__(o.__class__):
-                return o.isoformat()
-            if datetime.date.__subclasscheck__(o.__class__):
-                return o.isoformat()
-        finally:
-            try:
-                oo = super().default(o)
-            except:
-                oo = o.__repr__()
-        return oo
-
-
-class JSONResponse(ResponseBase):
+        codec = codec or self.codec or codecs.negotiate()
+        if status_code is None or 200 <= status_code < 300:
+            projection = get_fields_projection()
+            if projection:
+                response = project_fields(response, projection)
+        response = codec.encode(response)
+        super().__init__(response, status_code, headers, mimetype=codec.media_type)
+        if etag:
+            self.set_etag(generate_etag(response), weak=weak_etag)
+
+
+class JSONResponse(EncodedResponse):
+    """JSON response
+
+    :param etag: set `ETag` header from the hash of serialized body
+    :param weak_etag: mark the `ETag` as a weak validator
+    """
+    codec = JSONCodec()
+
+
+class NegotiatedResponse(EncodedResponse):
+    """Response that is encoded by the media type from the `Accept` request header
+    (ex: `application/json`, `application/msgpack`)
+
+    :param etag: set `ETag` header from the hash of encoded body
+    :param weak_etag: mark the `ETag` as a weak validator
+    """
     def __init__(
         self,
         response: Any = None,
@@ -57,10 +70,12 @@ class JSONResponse(ResponseBase):
         headers: Optional[
             Union[Mapping[str, Union[str, int, Iterable[Union[str, int]]]],
             Iterable[Tuple[str, Union[str, int]]]]
-        ] = None
+        ] = None,
+        etag: bool = False,
+        weak_etag: bool = False
     ) -> None:
-        response = json.dumps(response, cls=SwaggerJSONEncoder)
-        super().__init__(response, status_code, headers, mimetype="application/json")
+        super().__init__(response, status_code, headers, etag, weak_etag)
+        self.vary.add("Accept")
 
 
 class HTMLResponse(ResponseBase):
@@ -6,18 +6,44 @@ import re
 import typing as t
 import pydantic
 from collections import defaultdict
-from flask import Flask, Blueprint, Response, jsonify, request, Request
+from flask import (
+    Flask, Blueprint, Response, current_app, g, has_app_context, has_request_context,
+    jsonify, make_response, request, Request
+)
 from flask.scaffold import _sentinel
-from functools import wraps
+from functools import partial, wraps
 from typing import Any, Callable, Dict, Mapping, List, Tuple, Type, Union, Optional
 from pydantic import BaseModel, create_model
-from werkzeug.datastructures import FileStorage
+from werkzeug.datastructures import FileStorage, Headers
+from werkzeug.exceptions import BadRequest, Forbidden
 
-from .responses import JSONResponse
-from .exceptions import SwaggerPathError
-from .dependencies import Depends
+from .admission import AdmissionController, ConcurrencyLimit, Priority, get_priority
+from .background import BackgroundTaskPool, BackgroundTasks
+from .batch import BatchDispatcher, BatchRequest, batch_responses_example
+from .executors import ProcessExecutor, check_picklable
+from .compression import RequestDecompression
+from .limits import BodyLimits, body_limit_errors
+from .caching import (
+    Cache,
+    SingleFlight,
+    apply_http_caching,
+    cache_control_header,
+    is_not_modified,
+    not_modified_response,
+    request_key
+)
+from .codec import JSONCodec, codecs
+from .idempotency import IDEMPOTENT_METHODS, Idempotency
+from .ratelimit import RateLimit
+from .projection import FIELDS_PARAM, fields_errors, parse_fields, validate_fields
+from .responses import JSONResponse, NegotiatedResponse
+from .deadlines import DEADLINE_HEADER, Deadline
+from .exceptions import BodyLimitExceeded, DeadlineExceeded, SwaggerPathError
+from .dependencies import Depends, DependencyResolver
 from .schemas import BaseSchema
 from .security import HTTPSecurityBase
+from .streaming import get_stream_item_type, iter_validated, iter_validated_batches, stream_request_body
+from .uploads import UploadFile, parse_multipart
 from .params import (
     _ParamsClasses,
     ParamsType,
@@ -25,6 +51,7 @@ from .params import (
     _FormClasses,
     FormType,
     ParamSignature,
+    is_multi_value,
     Header,
     Path,
     Query,
@@ -60,6 +87,21 @@ class EndpointDefinition():
                 "responses": {}
             }
     :param pydantic_model: 
+    :param cache_control: endpoint's `Cache-Control` response header
+    :param etag: set `True` if the endpoint responds with `ETag` and supports `If-None-Match`
+    :param weak_etag: set `True` if the endpoint's `ETag` is a weak validator
+    :param sparse_fields: set `True` if the endpoint accepts `fields` query parameter
+    :param response_model: pydantic model of the endpoint's response
+    :param rate_limit: endpoint's `RateLimit`
+    :param scopes: scopes required by the endpoint, passed to the security's `authorize`
+    :param concurrency_limit: endpoint's `ConcurrencyLimit`
+    :param priority: endpoint's admission priority class
+    :param admission: `AdmissionController` of the endpoint's router
+    :param idempotency: endpoint's `Idempotency`
+    :param timeout: endpoint's deadline in seconds
+    :param deadline_header: request header of the incoming deadline
+    :param body_limits: endpoint's `BodyLimits`
+    :param executor: endpoint's `ProcessExecutor`
     """
     _all_endpoints: Type["EndpointDefinition"] = []
 
@@ -77,7 +119,22 @@ class EndpointDefinition():
         custom_swagger: Optional[Dict[str, Any]] = None,
         pydantic_model: BaseModel = None,
         security: Optional[HTTPSecurityBase] = None,
-        aliases: Optional[Dict[str, Dict[str, str]]] = []
+        aliases: Optional[Dict[str, Dict[str, str]]] = [],
+        cache_control: Optional[str] = None,
+        etag: bool = False,
+        weak_etag: bool = False,
+        sparse_fields: bool = False,
+        response_model: Optional[Type[BaseModel]] = None,
+        rate_limit: Optional[RateLimit] = None,
+        scopes: Optional[List[str]] = None,
+        concurrency_limit: Optional[ConcurrencyLimit] = None,
+        priority: Priority = Priority.normal,
+        admission: Optional[AdmissionController] = None,
+        idempotency: Optional[Idempotency] = None,
+        timeout: Optional[float] = None,
+        deadline_header: Optional[str] = None,
+        body_limits: Optional[BodyLimits] = None,
+        executor: Optional[ProcessExecutor] = None
     ) -> None:
         self.rule = rule
         self.method = method.lower()
@@ -91,6 +148,21 @@ class EndpointDefinition():
         self.pydantic_model = pydantic_model
         self.security = security
         self.aliases = aliases
+        self.cache_control = cache_control
+        self.etag = etag
+        self.weak_etag = weak_etag
+        self.sparse_fields = sparse_fields
+        self.response_model = response_model
+        self.rate_limit = rate_limit
+        self.scopes = scopes or []
+        self.concurrency_limit = concurrency_limit
+        self.priority = priority
+        self.admission = admission
+        self.idempotency = idempotency
+        self.timeout = timeout
+        self.deadline_header = deadline_header
+        self.body_limits = body_limits
+        self.executor = executor
         if responses:
             self.responses = responses
         else:
@@ -162,6 +234,55 @@ class APIRouter(Blueprint):
     :param tags: endpoint's swagger tags
     :param auto_swagger: set this `True` will generate the endpoint 
         swagger automatically using `AutoSwagger`
+    :param sparse_fields: reserve `fields` query parameter on all endpoints
+        to select the response fields, ex: `?fields=id,owner.name`
+    :param rate_limit: `RateLimit` of all endpoints, the requests are counted together
+        unless the `RateLimit` has its own `name`
+    :param admission: `AdmissionController` of all endpoints, it sheds the lowest priority requests first
+        when the worker is busy. Share one controller between routers to count their requests together
+    :param deadline_header: request header of the incoming deadline in seconds, set `None` to ignore it
+    :param decompression: `RequestDecompression` of `gzip` and `deflate` encoded request bodies,
+        set `None` to leave them encoded
+    :param body_limits: `BodyLimits` of the request bodies of all endpoints
+    :param process_executor: `ProcessExecutor` of the endpoints with `executor="process"`,
+        it's created when the first of them is defined
+    :param background_pool: `BackgroundTaskPool` of the tasks that the view functions add to
+        their `BackgroundTasks` parameter, it's created when the first of them is defined
+
+    Route decorators (`get`, `post`, `put`, `delete`, `patch`, `route`) also accept :
+    :param cache_control: `Cache-Control` header value or directives mapping
+        - example : {"max_age": 30, "public": True}
+    :param etag: compute `ETag` from the response body and answer `304 Not Modified`
+        when it matches `If-None-Match`
+    :param weak_etag: mark the computed `ETag` as weak
+    :param etag_func: function that receives the validated kwargs and returns the `ETag`,
+        the view function won't be called if the client copy is still fresh
+    :param cache: server-side response `Cache` keyed by the validated parameters
+    :param coalesce: concurrent `GET` requests with identical validated parameters
+        wait for a single computation and share its response
+    :param sparse_fields: override the router's `sparse_fields`
+    :param response_model: pydantic model to validate the requested `fields` against
+    :param rate_limit: `RateLimit` that overrides the router's `rate_limit`, answers `429 Too Many Requests`
+        before the request parameters are parsed
+    :param scopes: scopes required by the endpoint, the security's `authorize` decides whether the principal
+        has them and `403 Forbidden` is answered before the request parameters are parsed
+    :param max_concurrency: maximum requests the endpoint handles at once in each worker,
+        the rest are answered with `503 Service Unavailable` (`429 Too Many Requests` for endpoints
+        tagged `"low-priority"`) before the security check and the request parameters parsing
+    :param queue_timeout: seconds a request waits for a free slot of `max_concurrency` before it's rejected
+    :param priority: admission priority class (`"low"`, `"normal"`, `"high"` or `"critical"`),
+        default is taken from the tags (ex: `"low-priority"`, `"health"`) or `"normal"`
+    :param idempotent: `True` or an `Idempotency` to replay the first response of `POST`, `PUT` and `PATCH`
+        requests for their retries with the same `Idempotency-Key` header
+    :param timeout: seconds of the request deadline, shortened by the incoming `X-Request-Timeout` header.
+        It's checked while binding the parameters, before calling every dependency and while awaiting
+        async view functions, and `504 Gateway Timeout` is answered once it's exceeded.
+        Get it in the view function with `deadline: Deadline = Depends(get_deadline)`
+    :param body_limits: `BodyLimits` that override the router's limits one by one, the request body is rejected
+        with `413 Request Entity Too Large` or `422 Unprocessable Entity` while it's read, before its validation
+    :param executor: `"process"` (or a `ProcessExecutor`) runs the view function in the router's process pool
+        with the validated kwargs, for CPU-bound endpoints that would hold the GIL. The view function must be
+        a module-level function and its result must be picklable
     """
 
     _api_routers: Dict[str, Type["APIRouter"]] = {}
@@ -181,7 +302,15 @@ class APIRouter(Blueprint):
         tags: Optional[List[str]] = [],
         auto_swagger: bool = True,
         security: Optional[HTTPSecurityBase] = None,
-        dependencies: Optional[List[Callable]] = []
+        dependencies: Optional[List[Callable]] = [],
+        sparse_fields: bool = False,
+        rate_limit: Optional[RateLimit] = None,
+        admission: Optional[AdmissionController] = None,
+        deadline_header: Optional[str] = DEADLINE_HEADER,
+        decompression: Optional[RequestDecompression] = RequestDecompression(),
+        body_limits: Optional[BodyLimits] = None,
+        process_executor: Optional[ProcessExecutor] = None,
+        background_pool: Optional[BackgroundTaskPool] = None
     ):
         super().__init__(
             name=name,
@@ -196,6 +325,7 @@ class APIRouter(Blueprint):
             cli_group=cli_group
         )
         self.paired_signature: Dict[str, Dict[str, ParamsType]] = {}
+        self.endpoint_calls: Dict[str, Callable[..., Any]] = {}
         self.aliases: Dict[str, Dict[str, str]] = {}
         APIRouter._api_routers[name] = self
         self.defined_endpoints: List[EndpointDefinition] = []
@@ -204,6 +334,16 @@ class APIRouter(Blueprint):
         self.tags = tags
         self.security = security
         self.dependecies = dependencies
+        self.sparse_fields = sparse_fields
+        self.rate_limit = rate_limit
+        if rate_limit and not rate_limit.name:
+            rate_limit.name = name
+        self.admission = admission
+        self.deadline_header = deadline_header
+        self.decompression = decompression
+        self.body_limits = body_limits
+        self.process_executor = process_executor
+        self.background_pool = background_pool
         self.available_methods = ["GET", "POST", "PUT", "DELETE", "PATCH"]
 
     def register(self, app: Flask, options: dict) -> None:
@@ -237,6 +377,8 @@ class APIRouter(Blueprint):
         app.blueprints[name] = self
         self._got_registered_once = True
         self._is_registered = True
+        if self.process_executor and self.process_executor.warm_up:
+            self.process_executor.warm()
         state = self.make_setup_state(app, options, first_bp_registration)
 
         if self.has_static_folder:
@@ -326,11 +468,45 @@ class APIRouter(Blueprint):
         custom_swagger: Optional[Dict[str, Any]] = None,
         security: Optional[HTTPSecurityBase] = None,
         dependencies: Optional[List[Callable]] = [],
+        cache_control: Optional[Union[str, Dict[str, Any]]] = None,
+        etag: bool = False,
+        weak_etag: bool = False,
+        etag_func: Optional[Callable[..., str]] = None,
+        cache: Optional[Cache] = None,
+        coalesce: bool = False,
+        sparse_fields: Optional[bool] = None,
+        response_model: Optional[Type[BaseModel]] = None,
+        rate_limit: Optional[RateLimit] = None,
+        scopes: Optional[List[str]] = None,
+        max_concurrency: Optional[int] = None,
+        queue_timeout: float = 0,
+        priority: Optional[Union[Priority, int, str]] = None,
+        idempotent: Union[bool, Idempotency] = False,
+        timeout: Optional[float] = None,
+        body_limits: Optional[BodyLimits] = None,
+        executor: Optional[Union[str, ProcessExecutor]] = None,
         **options: Any
     ) -> Callable:
         return self._method_route(
             "GET", rule, options, tags, summary, description, response_description,
-            responses, auto_swagger, custom_swagger, security, dependencies
+            responses, auto_swagger, custom_swagger, security, dependencies,
+            cache_control=cache_control,
+            etag=etag,
+            weak_etag=weak_etag,
+            etag_func=etag_func,
+            cache=cache,
+            coalesce=coalesce,
+            sparse_fields=sparse_fields,
+            response_model=response_model,
+            rate_limit=rate_limit,
+            scopes=scopes,
+            max_concurrency=max_concurrency,
+            queue_timeout=queue_timeout,
+            priority=priority,
+            idempotent=idempotent,
+            timeout=timeout,
+            body_limits=body_limits,
+            executor=executor
         )
 
     def post(
@@ -345,11 +521,45 @@ class APIRouter(Blueprint):
         custom_swagger: Optional[Dict[str, Any]] = None,
         security: Optional[HTTPSecurityBase] = None,
         dependencies: Optional[List[Callable]] = [],
+        cache_control: Optional[Union[str, Dict[str, Any]]] = None,
+        etag: bool = False,
+        weak_etag: bool = False,
+        etag_func: Optional[Callable[..., str]] = None,
+        cache: Optional[Cache] = None,
+        coalesce: bool = False,
+        sparse_fields: Optional[bool] = None,
+        response_model: Optional[Type[BaseModel]] = None,
+        rate_limit: Optional[RateLimit] = None,
+        scopes: Optional[List[str]] = None,
+        max_concurrency: Optional[int] = None,
+        queue_timeout: float = 0,
+        priority: Optional[Union[Priority, int, str]] = None,
+        idempotent: Union[bool, Idempotency] = False,
+        timeout: Optional[float] = None,
+        body_limits: Optional[BodyLimits] = None,
+        executor: Optional[Union[str, ProcessExecutor]] = None,
         **options: Any
     ) -> Callable:
         return self._method_route(
             "POST", rule, options, tags, summary, description, response_description,
-            responses, auto_swagger, custom_swagger, security, dependencies
+            responses, auto_swagger, custom_swagger, security, dependencies,
+            cache_control=cache_control,
+            etag=etag,
+            weak_etag=weak_etag,
+            etag_func=etag_func,
+            cache=cache,
+            coalesce=coalesce,
+            sparse_fields=sparse_fields,
+            response_model=response_model,
+            rate_limit=rate_limit,
+            scopes=scopes,
+            max_concurrency=max_concurrency,
+            queue_timeout=queue_timeout,
+            priority=priority,
+            idempotent=idempotent,
+            timeout=timeout,
+            body_limits=body_limits,
+            executor=executor
         )
     
     def put(
@@ -364,11 +574,45 @@ class APIRouter(Blueprint):
         custom_swagger: Optional[Dict[str, Any]] = None,
         security: Optional[HTTPSecurityBase] = None,
         dependencies: Optional[List[Callable]] = [],
+        cache_control: Optional[Union[str, Dict[str, Any]]] = None,
+        etag: bool = False,
+        weak_etag: bool = False,
+        etag_func: Optional[Callable[..., str]] = None,
+        cache: Optional[Cache] = None,
+        coalesce: bool = False,
+        sparse_fields: Optional[bool] = None,
+        response_model: Optional[Type[BaseModel]] = None,
+        rate_limit: Optional[RateLimit] = None,
+        scopes: Optional[List[str]] = None,
+        max_concurrency: Optional[int] = None,
+        queue_timeout: float = 0,
+        priority: Optional[Union[Priority, int, str]] = None,
+        idempotent: Union[bool, Idempotency] = False,
+        timeout: Optional[float] = None,
+        body_limits: Optional[BodyLimits] = None,
+        executor: Optional[Union[str, ProcessExecutor]] = None,
         **options: Any
     ) -> Callable:
         return self._method_route(
             "PUT", rule, options, tags, summary, description, response_description,
-            responses, auto_swagger, custom_swagger, security, dependencies
+            responses, auto_swagger, custom_swagger, security, dependencies,
+            cache_control=cache_control,
+            etag=etag,
+            weak_etag=weak_etag,
+            etag_func=etag_func,
+            cache=cache,
+            coalesce=coalesce,
+            sparse_fields=sparse_fields,
+            response_model=response_model,
+            rate_limit=rate_limit,
+            scopes=scopes,
+            max_concurrency=max_concurrency,
+            queue_timeout=queue_timeout,
+            priority=priority,
+            idempotent=idempotent,
+            timeout=timeout,
+            body_limits=body_limits,
+            executor=executor
         )
 
     def delete(
@@ -383,11 +627,45 @@ class APIRouter(Blueprint):
         custom_swagger: Optional[Dict[str, Any]] = None,
         security: Optional[HTTPSecurityBase] = None,
         dependencies: Optional[List[Callable]] = [],
+        cache_control: Optional[Union[str, Dict[str, Any]]] = None,
+        etag: bool = False,
+        weak_etag: bool = False,
+        etag_func: Optional[Callable[..., str]] = None,
+        cache: Optional[Cache] = None,
+        coalesce: bool = False,
+        sparse_fields: Optional[bool] = None,
+        response_model: Optional[Type[BaseModel]] = None,
+        rate_limit: Optional[RateLimit] = None,
+        scopes: Optional[List[str]] = None,
+        max_concurrency: Optional[int] = None,
+        queue_timeout: float = 0,
+        priority: Optional[Union[Priority, int, str]] = None,
+        idempotent: Union[bool, Idempotency] = False,
+        timeout: Optional[float] = None,
+        body_limits: Optional[BodyLimits] = None,
+        executor: Optional[Union[str, ProcessExecutor]] = None,
         **options: Any
     ) -> Callable:
         return self._method_route(
             "DELETE", rule, options, tags, summary, description, response_description,
-            responses, auto_swagger, custom_swagger, security, dependencies
+            responses, auto_swagger, custom_swagger, security, dependencies,
+            cache_control=cache_control,
+            etag=etag,
+            weak_etag=weak_etag,
+            etag_func=etag_func,
+            cache=cache,
+            coalesce=coalesce,
+            sparse_fields=sparse_fields,
+            response_model=response_model,
+            rate_limit=rate_limit,
+            scopes=scopes,
+            max_concurrency=max_concurrency,
+            queue_timeout=queue_timeout,
+            priority=priority,
+            idempotent=idempotent,
+            timeout=timeout,
+            body_limits=body_limits,
+            executor=executor
         )
     
     def patch(
@@ -402,11 +680,45 @@ class APIRouter(Blueprint):
         custom_swagger: Optional[Dict[str, Any]] = None,
         security: Optional[HTTPSecurityBase] = None,
         dependencies: Optional[List[Callable]] = [],
+        cache_control: Optional[Union[str, Dict[str, Any]]] = None,
+        etag: bool = False,
+        weak_etag: bool = False,
+        etag_func: Optional[Callable[..., str]] = None,
+        cache: Optional[Cache] = None,
+        coalesce: bool = False,
+        sparse_fields: Optional[bool] = None,
+        response_model: Optional[Type[BaseModel]] = None,
+        rate_limit: Optional[RateLimit] = None,
+        scopes: Optional[List[str]] = None,
+        max_concurrency: Optional[int] = None,
+        queue_timeout: float = 0,
+        priority: Optional[Union[Priority, int, str]] = None,
+        idempotent: Union[bool, Idempotency] = False,
+        timeout: Optional[float] = None,
+        body_limits: Optional[BodyLimits] = None,
+        executor: Optional[Union[str, ProcessExecutor]] = None,
         **options: Any
     ) -> Callable:
         return self._method_route(
             "PATCH", rule, options, tags, summary, description, response_description,
-            responses, auto_swagger, custom_swagger, security, dependencies
+            responses, auto_swagger, custom_swagger, security, dependencies,
+            cache_control=cache_control,
+            etag=etag,
+            weak_etag=weak_etag,
+            etag_func=etag_func,
+            cache=cache,
+            coalesce=coalesce,
+            sparse_fields=sparse_fields,
+            response_model=response_model,
+            rate_limit=rate_limit,
+            scopes=scopes,
+            max_concurrency=max_concurrency,
+            queue_timeout=queue_timeout,
+            priority=priority,
+            idempotent=idempotent,
+            timeout=timeout,
+            body_limits=body_limits,
+            executor=executor
         )
     
     def _method_route(
@@ -422,7 +734,24 @@ class APIRouter(Blueprint):
         auto_swagger: bool = True,
         custom_swagger: Optional[Dict[str, Any]] = None,
         security: Optional[HTTPSecurityBase] = None,
-        dependencies: Optional[List[Callable]] = []
+        dependencies: Optional[List[Callable]] = [],
+        cache_control: Optional[Union[str, Dict[str, Any]]] = None,
+        etag: bool = False,
+        weak_etag: bool = False,
+        etag_func: Optional[Callable[..., str]] = None,
+        cache: Optional[Cache] = None,
+        coalesce: bool = False,
+        sparse_fields: Optional[bool] = None,
+        response_model: Optional[Type[BaseModel]] = None,
+        rate_limit: Optional[RateLimit] = None,
+        scopes: Optional[List[str]] = None,
+        max_concurrency: Optional[int] = None,
+        queue_timeout: float = 0,
+        priority: Optional[Union[Priority, int, str]] = None,
+        idempotent: Union[bool, Idempotency] = False,
+        timeout: Optional[float] = None,
+        body_limits: Optional[BodyLimits] = None,
+        executor: Optional[Union[str, ProcessExecutor]] = None,
     ) -> Callable:
         if "methods" in options:
             raise TypeError("Use the 'route' decorator to use the 'methods' argument")
@@ -438,9 +767,65 @@ class APIRouter(Blueprint):
             custom_swagger=custom_swagger,
             security=security,
             dependencies=dependencies,
+            cache_control=cache_control,
+            etag=etag,
+            weak_etag=weak_etag,
+            etag_func=etag_func,
+            cache=cache,
+            coalesce=coalesce,
+            sparse_fields=sparse_fields,
+            response_model=response_model,
+            rate_limit=rate_limit,
+            scopes=scopes,
+            max_concurrency=max_concurrency,
+            queue_timeout=queue_timeout,
+            priority=priority,
+            idempotent=idempotent,
+            timeout=timeout,
+            body_limits=body_limits,
+            executor=executor,
             **options
             )
 
+    def batch_endpoint(
+        self,
+        rule: str = "/batch",
+        max_requests: int = 20,
+        max_concurrency: int = 4,
+        tags: Optional[List[str]] = [],
+        summary: Optional[str] = "Batch requests",
+        **options: Any
+    ) -> BatchDispatcher:
+        """Register a `POST` endpoint that takes an array of `{method, path, query, headers, body}` sub-requests,
+        dispatches them in-process through the app's URL map and endpoints, and answers the array of
+        their `{status, headers, body}` responses. The sub-requests inherit the batch request headers
+        except its body, idempotency, conditional and deadline headers
+
+        :param max_requests: maximum sub-requests of a batch, a longer batch is answered with `422 Unprocessable Entity`
+        :param max_concurrency: maximum `GET`, `HEAD` and `OPTIONS` sub-requests that run at once in each worker,
+            the other methods run one at a time in their order
+        :param options: options of the `post` decorator
+        """
+        dispatcher = BatchDispatcher(max_concurrency, [self.deadline_header] if self.deadline_header else None)
+        options["body_limits"] = (options.get("body_limits") or BodyLimits()).override(
+            BodyLimits(max_array_length=max_requests)
+        )
+        options.setdefault("responses", {"200": batch_responses_example()})
+
+        def batch(requests: List[BatchRequest] = Body(stream=True)):
+            responses = dispatcher.dispatch(
+                current_app._get_current_object(),
+                list(requests),
+                Headers(request.headers),
+                request.url_rule.endpoint,
+                {"REMOTE_ADDR": request.remote_addr},
+                request.url_root
+            )
+            return JSONResponse(responses)
+
+        self.post(rule, tags=tags, summary=summary, **options)(batch)
+        return dispatcher
+
     def add_url_rule(
         self,
         rule: str,
@@ -456,6 +841,23 @@ class APIRouter(Blueprint):
         custom_swagger: Optional[Dict[str, Any]] = None,
         security: Optional[HTTPSecurityBase] = None,
         dependencies: Optional[List[Callable]] = [],
+        cache_control: Optional[Union[str, Dict[str, Any]]] = None,
+        etag: bool = False,
+        weak_etag: bool = False,
+        etag_func: Optional[Callable[..., str]] = None,
+        cache: Optional[Cache] = None,
+        coalesce: bool = False,
+        sparse_fields: Optional[bool] = None,
+        response_model: Optional[Type[BaseModel]] = None,
+        rate_limit: Optional[RateLimit] = None,
+        scopes: Optional[List[str]] = None,
+        max_concurrency: Optional[int] = None,
+        queue_timeout: float = 0,
+        priority: Optional[Union[Priority, int, str]] = None,
+        idempotent: Union[bool, Idempotency] = False,
+        timeout: Optional[float] = None,
+        body_limits: Optional[BodyLimits] = None,
+        executor: Optional[Union[str, ProcessExecutor]] = None,
         **options: t.Any
     ) -> None:
         self.route(
@@ -472,6 +874,23 @@ class APIRouter(Blueprint):
             custom_swagger=custom_swagger,
             security=security,
             dependencies=dependencies,
+            cache_control=cache_control,
+            etag=etag,
+            weak_etag=weak_etag,
+            etag_func=etag_func,
+            cache=cache,
+            coalesce=coalesce,
+            sparse_fields=sparse_fields,
+            response_model=response_model,
+            rate_limit=rate_limit,
+            scopes=scopes,
+            max_concurrency=max_concurrency,
+            queue_timeout=queue_timeout,
+            priority=priority,
+            idempotent=idempotent,
+            timeout=timeout,
+            body_limits=body_limits,
+            executor=executor,
             **options
         )(view_func)
 
@@ -487,6 +906,23 @@ class APIRouter(Blueprint):
         custom_swagger: Optional[Dict[str, Any]] = None,
         security: Optional[HTTPSecurityBase] = None,
         dependencies: Optional[List[Callable]] = [],
+        cache_control: Optional[Union[str, Dict[str, Any]]] = None,
+        etag: bool = False,
+        weak_etag: bool = False,
+        etag_func: Optional[Callable[..., str]] = None,
+        cache: Optional[Cache] = None,
+        coalesce: bool = False,
+        sparse_fields: Optional[bool] = None,
+        response_model: Optional[Type[BaseModel]] = None,
+        rate_limit: Optional[RateLimit] = None,
+        scopes: Optional[List[str]] = None,
+        max_concurrency: Optional[int] = None,
+        queue_timeout: float = 0,
+        priority: Optional[Union[Priority, int, str]] = None,
+        idempotent: Union[bool, Idempotency] = False,
+        timeout: Optional[float] = None,
+        body_limits: Optional[BodyLimits] = None,
+        executor: Optional[Union[str, ProcessExecutor]] = None,
         **options: Any
     ) -> Callable:
 
@@ -495,14 +931,50 @@ class APIRouter(Blueprint):
         assert (self.url_prefix+rule)[0] == "/", f"path rule must starts with '/' -> {rule}"
 
         security = self.security if not security else security
+        rate_limit = self.rate_limit if not rate_limit else rate_limit
         
         self.update_dependencies(dependencies)
+
+        cache_control = cache_control_header(cache_control)
+        etag = etag or weak_etag or etag_func is not None
+        cache_prefix = f"{self.name}:{self.url_prefix+rule}"
+        single_flight = SingleFlight() if coalesce else None
+        sparse_fields = self.sparse_fields if sparse_fields is None else sparse_fields
+        if rate_limit and not rate_limit.name:
+            rate_limit.name = cache_prefix
+        authorize = bool(security and security.has_authorization)
+        required_scopes = frozenset(scopes or [])
+        idempotency = Idempotency() if idempotent is True else idempotent or None
+        use_principal = bool(security and (rate_limit or cache or single_flight or authorize or idempotency))
+        defined_eps: Dict[str, EndpointDefinition] = {}
+        if self.admission:
+            priority = self.admission.get_priority(priority, tags+self.tags)
+        else:
+            priority = get_priority(priority, tags+self.tags)
+        concurrency_limit = ConcurrencyLimit.from_options(max_concurrency, queue_timeout, priority)
+        if self.body_limits:
+            body_limits = self.body_limits.override(body_limits)
+        assert executor in [None, "process"] or isinstance(executor, ProcessExecutor), \
+            f"executor must be 'process' or a ProcessExecutor -> {rule}"
+        if executor == "process":
+            if self.process_executor is None:
+                self.process_executor = ProcessExecutor()
+            executor = self.process_executor
         
         def decorator(func: Callable) -> Callable:
             paired_params = self._get_func_signature(rule, func)
             aliases = self.get_params_aliases(paired_params)
+            multi_values = self.get_multi_value_params(paired_params)
             self.paired_signature[self.url_prefix+rule] = paired_params
 
+            assert not sparse_fields or FIELDS_PARAM not in aliases["query"].values(), \
+                f"'{FIELDS_PARAM}' query parameter is reserved for sparse fieldsets -> {rule}"
+            assert not self.has_stream_body(paired_params) or self.count_required_body(paired_params) == 1, \
+                f"streamed body must be the only body parameter -> {rule}"
+            streamed_body = self.has_stream_body(paired_params) or any(
+                type(pp.param_object) == File for pp in paired_params.values()
+            )
+
             pydantic_model_no_body = self.generate_endpoint_pydantic(
                 func.__name__+"Schema_no_Body", paired_params, with_body=False
             )
@@ -510,33 +982,203 @@ class APIRouter(Blueprint):
                 func.__name__+"Schema", paired_params, with_body=True
             )
 
+            resolver = DependencyResolver(func)
+            if executor:
+                check_picklable(func)
+                assert not resolver.background_tasks, \
+                    f"BackgroundTasks parameter can't be passed to a process executor, get it in a dependency -> {rule}"
+            background_pool = None
+            if resolver.uses_background_tasks:
+                if self.background_pool is None:
+                    self.background_pool = BackgroundTaskPool()
+                background_pool = self.background_pool
+
+            def run_view(
+                kwargs: Dict[str, Any],
+                deadline: Optional[Deadline],
+                tasks: Optional[BackgroundTasks] = None
+            ) -> Any:
+                if background_pool and tasks is None:
+                    # no response to wait for (ex: `APIRouter.call`, cache refresh), the tasks start right away
+                    tasks = BackgroundTasks()
+                    rv = run_view(kwargs, deadline, tasks)
+                    background_pool.submit(tasks)
+                    return rv
+                if executor:
+                    # dependencies are resolved here, only the view function runs in the process
+                    return executor.run(func, resolver.resolve(kwargs, deadline, tasks), deadline)
+                rv = resolver(kwargs, deadline, tasks)
+                if inspect.isawaitable(rv):
+                    rv = (deadline or Deadline()).run(rv)
+                return rv
+
+            def view(**kwargs):
+                rv = run_view(kwargs, g.get("deadline"), g.get("background_tasks"))
+                if isinstance(rv, (dict, list, BaseModel)):
+                    if g.get("sparse_fields") or codecs.negotiate() is not codecs.default:
+                        return NegotiatedResponse(rv)
+                return rv
+
             def create_modified_func():
                 @wraps(func)
                 def modified_func(**paths):
+                    g.deadline = Deadline.from_request(request, timeout, self.deadline_header)
+                    if self.decompression:
+                        self.decompression.apply(request)
+                    if body_limits and request.method != "GET":
+                        body_limits.apply(request)
                     try:
-                        req = security(request) if security else request
+                        principal = security(request) if security else None
+                        req = principal if isinstance(principal, Request) else request
+                        if use_principal and principal is req:
+                            principal = security.get_principal(req)
+                        principal_key = None
+                        if use_principal and principal is not None:
+                            principal_key = security.get_principal_key(principal)
+
+                        if rate_limit:
+                            allowed, retry_after = rate_limit.hit(req, principal_key)
+                            if not allowed:
+                                return JSONResponse(
+                                    response={"detail": "Too Many Requests"},
+                                    status_code=429,
+                                    headers={"Retry-After": str(retry_after)}
+                                )
+
+                        if authorize:
+                            defined_ep = defined_eps.get(req.method.lower()) or defined_eps.get("get")
+                            if not security.is_authorized(principal, defined_ep, required_scopes):
+                                return JSONResponse(
+                                    response={"detail": "Forbidden"},
+                                    status_code=403
+                                )
+
+                        if idempotency and req.method in IDEMPOTENT_METHODS:
+                            return idempotency.handle(
+                                req,
+                                f"{cache_prefix}:{req.method}",
+                                principal_key,
+                                lambda: make_response(handle_request(paths, req, principal_key)),
+                                not streamed_body
+                            )
+                        return handle_request(paths, req, principal_key)
+                    except Exception as e:
+                        raise e
+
+                def handle_request(paths: Dict[str, Any], req: Request, principal_key: Any):
+                    try:
+                        fields = request.args.get(FIELDS_PARAM) if sparse_fields else None
+                        if fields:
+                            projection = parse_fields(fields)
+                            invalid_fields = validate_fields(projection, response_model)
+                            if invalid_fields:
+                                return JSONResponse(
+                                    response=fields_errors(invalid_fields),
+                                    status_code=422
+                                )
+                            g.sparse_fields = projection
+
+                        g.deadline.check()
                         if req.method == "GET":
                             valid_kwargs = self.get_kwargs(
-                                paths, req, paired_params, pydantic_model_no_body, aliases
+                                paths, req, paired_params, pydantic_model_no_body, aliases,
+                                multi_values=multi_values
                             )
                         else:
                             valid_kwargs = self.get_kwargs(
-                                paths, req, paired_params, pydantic_model, aliases
+                                paths, req, paired_params, pydantic_model, aliases, body_limits, multi_values
                             )
-                        return func(**valid_kwargs)
+                        g.deadline.check()
+
+                        etag_value = None
+                        if etag_func:
+                            etag_value = etag_func(**valid_kwargs)
+                            if etag_value and is_not_modified(request, etag_value):
+                                return not_modified_response(etag_value, weak_etag, cache_control)
+
+                        if (cache or single_flight) and request.method in ["GET", "HEAD"]:
+                            key_kwargs = {**valid_kwargs, FIELDS_PARAM: fields} if fields else valid_kwargs
+                            if cache:
+                                key = cache.make_key(cache_prefix, key_kwargs, request, principal_key)
+                            else:
+                                key = request_key(cache_prefix, key_kwargs, principal_key, codecs.negotiate().media_type)
+
+                            def compute():
+                                if single_flight:
+                                    return single_flight.do(key, lambda: make_response(view(**valid_kwargs)))
+                                return make_response(view(**valid_kwargs))
+
+                            rv = cache.get_or_compute(key, compute, valid_kwargs) if cache else compute()
+                        else:
+                            rv = view(**valid_kwargs)
+
+                        if etag or cache_control:
+                            return apply_http_caching(
+                                request, make_response(rv), etag, weak_etag, cache_control, etag_value
+                            )
+                        return rv
                     except pydantic.ValidationError as e:
                         return JSONResponse(
                             response=e.errors(),
                             status_code=422
                         )
-                    except Exception as e:
-                        raise e
-                return modified_func
+                    except BodyLimitExceeded as e:
+                        return JSONResponse(
+                            response=body_limit_errors(e),
+                            status_code=422
+                        )
+                    except DeadlineExceeded as e:
+                        return JSONResponse(
+                            response={"detail": str(e)},
+                            status_code=504
+                        )
+
+                if not background_pool:
+                    return modified_func
+
+                @wraps(func)
+                def run_background_tasks(**paths):
+                    tasks = g.background_tasks = BackgroundTasks()
+                    response = make_response(modified_func(**paths))
+                    if len(tasks):
+                        # the WSGI server closes the response once it's sent
+                        response.call_on_close(partial(background_pool.submit, tasks, current_app._get_current_object()))
+                    return response
+                return run_background_tasks
+
+            def call_endpoint(**kwargs):
+                principal = None
+                if security:
+                    if not has_request_context():
+                        raise RuntimeError(f"'{func.__name__}' endpoint is secured, call it inside a request")
+                    principal = security(request)
+                    if authorize:
+                        req = principal if isinstance(principal, Request) else request
+                        if principal is req:
+                            principal = security.get_principal(req)
+                        defined_ep = defined_eps.get(request.method.lower()) or next(iter(defined_eps.values()))
+                        if not security.is_authorized(principal, defined_ep, required_scopes):
+                            raise Forbidden()
+
+                deadline = Deadline(timeout)
+                outer_deadline = g.get("deadline") if has_app_context() else None
+                if outer_deadline and outer_deadline.expires is not None and (
+                    deadline.expires is None or outer_deadline.expires < deadline.expires
+                ):
+                    deadline = outer_deadline
+
+                valid_kwargs = self.get_call_kwargs(kwargs, paired_params, pydantic_model)
+                return run_view(valid_kwargs, deadline)
 
             # register endpoint
             f = create_modified_func()
+            if concurrency_limit:
+                f = concurrency_limit(f)
+            if self.admission:
+                f = self.admission(f, priority)
             endpoint = options.pop("endpoint", None)
             Blueprint.add_url_rule(self, rule, endpoint, f, **options)
+            self.endpoint_calls[endpoint or func.__name__] = call_endpoint
 
             # register autoswagger
             for http_method in options.get("methods", ["GET"]):
@@ -558,9 +1200,25 @@ class APIRouter(Blueprint):
                     custom_swagger=custom_swagger,
                     pydantic_model=pydantic_model,
                     security=security,
-                    aliases=aliases
+                    aliases=aliases,
+                    cache_control=cache_control,
+                    etag=etag,
+                    weak_etag=weak_etag,
+                    sparse_fields=sparse_fields,
+                    response_model=response_model,
+                    rate_limit=rate_limit,
+                    scopes=scopes,
+                    concurrency_limit=concurrency_limit,
+                    priority=priority,
+                    admission=self.admission,
+                    idempotency=idempotency,
+                    timeout=timeout,
+                    deadline_header=self.deadline_header,
+                    body_limits=body_limits,
+                    executor=executor
                 )
                 self.defined_endpoints.append(defined_ep)
+                defined_eps[defined_ep.method] = defined_ep
             return func
 
         return decorator
@@ -580,7 +1238,7 @@ class APIRouter(Blueprint):
     
     def generate_endpoint_pydantic(self, name: str, paired_params: Dict[str, ParamSignature], with_body: bool = True):
         params = {
-            key: (pp._type, pp.param_object.copy()) 
+            key: (Any if getattr(pp.param_object, "stream", False) else pp._type, pp.param_object.copy())
             for key, pp in paired_params.items()
         }
         if not with_body:
@@ -596,6 +1254,10 @@ class APIRouter(Blueprint):
 
         ## get params signature pair from function
         for k, p in params_signature.items():
+            ## background tasks aren't request parameters
+            if annots.get(k) is BackgroundTasks:
+                continue
+
             ## get default value
             if p.default != inspect._empty:
                 if type(p.default) not in _ParamsClasses:
@@ -626,15 +1288,17 @@ class APIRouter(Blueprint):
             if k in annots:
                 default_type = annots[k]
                 if type(default_value) in _FormClasses:
-                    default_type = str if default_type == FileStorage else default_type
+                    default_type = UploadFile if default_type == FileStorage else default_type
             else:
                 if type(default_value) in _FormClasses:
                     default_type = Any
                 else:
                     default_type = str
             
-            ## check pydantic annots
-            if type(default_value) not in _FormClasses:
+            ## check pydantic annots, explicit multi-value query and header params are kept
+            multi_value = default_value is p.default and type(default_value) in [Query, Header] \
+                and is_multi_value(default_type)
+            if type(default_value) not in _FormClasses and not multi_value:
                 default_value = self.define_body_from_annots(default_value, default_type)
 
             pair[k] = ParamSignature(k, default_type, default_value)
@@ -649,6 +1313,9 @@ class APIRouter(Blueprint):
     def define_body_from_annots(self, default_value, annot):
         pydantic_model = self.get_pydantic_from_annots(annot)
         if pydantic_model:
+            if type(default_value) == Body and default_value.stream:
+                default_value.pydantic_model = pydantic_model
+                return default_value
             return Body(default_value.default, pydantic_model=pydantic_model)
         else:
             return default_value
@@ -709,36 +1376,63 @@ class APIRouter(Blueprint):
         request: Request,
         paired_params: Dict[str, ParamSignature],
         pydantic_model: BaseSchema,
-        aliases: Dict[str, str]
+        aliases: Dict[str, str],
+        body_limits: Optional[BodyLimits] = None,
+        multi_values: Optional[Dict[str, Dict[str, bool]]] = None
     ):
         """Get keyword args that will be passed to the function
         """
         # path
         variables = pydantic_model.__fields__.keys()
         kwargs = {**paths}
+        multi_values = multi_values or self.get_multi_value_params(paired_params)
 
-        # query
-        queries = request.args.to_dict()
-        query_kwargs = {k: queries[k] for k in self.convert_alias_to_name(aliases["query"], variables) if k in queries}
-        kwargs.update(query_kwargs)
+        # query, only the declared keys are looked up
+        multi_queries = multi_values["query"]
+        for k in self.convert_alias_to_name(aliases["query"], variables):
+            if k in multi_queries:
+                values = request.args.getlist(k)
+                if values:
+                    kwargs[k] = values if multi_queries[k] else self.split_values(values)
+            elif k in request.args:
+                kwargs[k] = request.args[k]
 
         # header
-        header_kwargs = {k: request.headers.get(k) for k in self.convert_alias_to_name(aliases["header"], variables) if request.headers.get(k)}
-        kwargs.update(header_kwargs)
+        multi_headers = multi_values["header"]
+        for k in self.convert_alias_to_name(aliases["header"], variables):
+            if k in multi_headers:
+                values = request.headers.getlist(k)
+                if values:
+                    kwargs[k] = self.split_values(values, strip=True)
+            else:
+                value = request.headers.get(k)
+                if value:
+                    kwargs[k] = value
 
         # body
         if request.method != "GET":
-            form_kwargs = {k: request.form.get(k) for k in self.convert_alias_to_name(aliases["form"], variables) if request.form.get(k)}
-            file_kwargs = {k: request.files.get(k) for k in self.convert_alias_to_name(aliases["file"], variables) if request.files.get(k)}
-            dummy_file_kwargs = {k: "__dummy" for k in file_kwargs}
-            kwargs.update({
-                **form_kwargs,
-                **dummy_file_kwargs
-            })
+            file_names = self.convert_alias_to_name(aliases["file"], variables)
+            if file_names:
+                file_params = {
+                    pp.param_object.alias or k: pp.param_object
+                    for k, pp in paired_params.items() if isinstance(pp.param_object, File)
+                }
+                form, files = parse_multipart(request, file_params)
+            else:
+                form, files = request.form, request.files
+            for k in self.convert_alias_to_name(aliases["form"], variables):
+                value = form.get(k)
+                if value:
+                    kwargs[k] = value
+            for k in file_names:
+                upload = files.get(k)
+                if upload:
+                    kwargs[k] = upload
 
         empty_keys = pydantic_model.get_non_exist_var_in_kwargs(**kwargs)
         total_body = self.count_required_body(paired_params)
         if total_body:
+            request_body = None
             for k in empty_keys:
                 if k in paired_params:
                     po = paired_params[k].param_object
@@ -747,18 +1441,24 @@ class APIRouter(Blueprint):
                     if type(po) == Body:
                         ak = po.alias or k
                         kwargs[k] = None
-                        if request.method != "GET":
+                        if request.method != "GET" and po.stream:
+                            kwargs[k] = stream_request_body(
+                                request, paired_params[k]._type, ak, po.batch_size, body_limits=body_limits
+                            )
+                        elif request.method != "GET":
+                            if request_body is None:
+                                request_body = self.get_request_body(request, body_limits)
                             b = self.get_pydantic_from_annots(po.dtype)
                             if b:
                                 if BaseModel.__subclasscheck__(b):
                                     if total_body == 1:
-                                        kwargs[k] = b(**request.json)
+                                        kwargs[k] = b(**request_body)
                                     else:
-                                        kwargs[k] = b(**request.json.get(ak, None))
+                                        kwargs[k] = b(**request_body.get(ak, None))
                                 else:
-                                    kwargs[k] = request.json.get(ak, None)
+                                    kwargs[k] = request_body.get(ak, None)
                             else:
-                                kwargs[k] = request.json.get(ak, None)
+                                kwargs[k] = request_body.get(ak, None)
                             
     
         # mapping the kwargs
@@ -766,12 +1466,73 @@ class APIRouter(Blueprint):
         valid_kwargs = self.fill_all_enum_value(valid_kwargs)
         valid_kwargs = vars(valid_kwargs)
 
-        # file kwargs should be placed after pydantic to make sure its not converted
-        if request.method != "GET":
-            valid_kwargs.update(file_kwargs)
-
         return valid_kwargs
 
+    def get_call_kwargs(
+        self,
+        kwargs: Dict[str, Any],
+        paired_params: Dict[str, ParamSignature],
+        pydantic_model: BaseSchema
+    ) -> Dict[str, Any]:
+        """Validate the keyword args of an in-process call, they're keyed by the parameter names
+        and passed as python values instead of being parsed from the request
+        """
+        aliased_kwargs = {}
+        for k, value in kwargs.items():
+            if k not in paired_params:
+                raise TypeError(f"unexpected keyword argument '{k}'")
+            po = paired_params[k].param_object
+            ak = po.alias or k
+            if type(po) == Body and po.stream:
+                item_type = get_stream_item_type(paired_params[k]._type)
+                if po.batch_size:
+                    value = iter_validated_batches(value, item_type, ak, po.batch_size)
+                else:
+                    value = iter_validated(value, item_type, ak)
+            aliased_kwargs[ak] = value
+
+        valid_kwargs = pydantic_model(**aliased_kwargs)
+        valid_kwargs = self.fill_all_enum_value(valid_kwargs)
+        return vars(valid_kwargs)
+
+    def call(self, endpoint_name: str, **kwargs: Any) -> Any:
+        """Call an endpoint of the router in-process with python values and get the view function's native result.
+        The kwargs are validated and the dependencies resolved the same way as a request, without building
+        or parsing an HTTP request. Inside a request, the endpoint's security checks the current request
+
+        :param endpoint_name: endpoint name, with or without the router name prefix
+        :param kwargs: parameters of the endpoint keyed by their names
+        """
+        name = endpoint_name
+        if name.startswith(f"{self.name}."):
+            name = name[len(self.name)+1:]
+        if name not in self.endpoint_calls:
+            raise ValueError(f"Endpoint '{endpoint_name}' is not defined in '{self.name}' router")
+        return self.endpoint_calls[name](**kwargs)
+
+    def get_request_body(self, request: Request, body_limits: Optional[BodyLimits] = None) -> Any:
+        """
+        Decode the request body with the codec of its `Content-Type`,
+        a JSON body is checked against the `body_limits` before it's decoded
+        """
+        codec = codecs.get(request.mimetype)
+        if codec is None:
+            body = request.json
+            if body_limits:
+                body_limits.check(body)
+            return body
+        data = request.get_data(cache=True)
+        is_json = codec.media_type == JSONCodec.media_type
+        if body_limits and is_json:
+            body_limits.scan_json(data)
+        try:
+            body = codec.decode(data)
+        except Exception as e:
+            raise BadRequest(f"Failed to decode {codec.media_type} request body") from e
+        if body_limits and not is_json:
+            body_limits.check(body)
+        return body
+
     def get_params_aliases(self, paired_params: Dict[str, ParamSignature]) -> Dict[str, Dict[str, str]]:
         aliases = {
             "path": {},
@@ -796,10 +1557,36 @@ class APIRouter(Blueprint):
                 aliases["file"][key] = pp.param_object.alias or key
         return aliases
     
+    def get_multi_value_params(self, paired_params: Dict[str, ParamSignature]) -> Dict[str, Dict[str, bool]]:
+        """
+        Get the aliases of `List[...]`/`Set[...]` query and header params mapped to their explode style,
+        `False` splits the comma-separated values. Headers are always comma-separated
+        """
+        multi_values = {
+            "query": {},
+            "header": {}
+        }
+        for key, pp in paired_params.items():
+            if not is_multi_value(pp._type):
+                continue
+            if isinstance(pp.param_object, Query):
+                multi_values["query"][pp.param_object.alias or key] = pp.param_object.explode
+            elif isinstance(pp.param_object, Header):
+                multi_values["header"][pp.param_object.alias or key] = False
+        return multi_values
+
+    def split_values(self, values: List[str], strip: bool = False) -> List[str]:
+        if strip:
+            return [v.strip() for value in values for v in value.split(",") if v.strip()]
+        return [v for value in values for v in value.split(",")]
+
     def convert_alias_to_name(self, aliases: Dict[str, str], input_name: List[str]):
         converted_name = [aliases[key] for key in input_name if key in aliases]
         return converted_name
 
+    def has_stream_body(self, paired_params: Dict[str, ParamSignature]) -> bool:
+        return any(type(pp.param_object) == Body and pp.param_object.stream for pp in paired_params.values())
+
     def count_required_body(self, paired_params: Dict[str, Any]) -> int:
         total = 0
         for pp in paired_params.values():
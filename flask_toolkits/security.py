@@ -1,23 +1,198 @@
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
 from base64 import b64decode
 from abc import ABC, abstractmethod
-from flask import request, Request
-from typing import Any, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from flask import g, request, Request
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, Optional, Tuple
 from enum import Enum
 from jose import jwt
+from werkzeug.exceptions import Unauthorized
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from .apikeys import APIKeyIndex
+from .caching import principal_identity
+from .jwks import JWKSKeyProvider
+from .responses import JSONResponse
+
+if TYPE_CHECKING:
+    from .routing import EndpointDefinition
 
 
 class HTTPScheme(Enum):
     basic: str = "basic"
     bearer: str = "bearer"
+    api_key: str = "apiKey"
+
+
+class APIKeyLocation(Enum):
+    header: str = "header"
+    query: str = "query"
+    cookie: str = "cookie"
+
+
+class VerifiedTokenCache():
+    """Bounded LRU cache of verified token claims.
+    An entry expires at the token's `exp` claim or after `ttl` seconds, whichever comes first
+
+    :param ttl: maximum seconds a verified token is trusted without verifying it again
+    :param max_entries: maximum cached tokens, the least recently used is evicted first
+    """
+    def __init__(self, ttl: float = 300, max_entries: int = 1024) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(data: str) -> str:
+        return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+
+    def get(self, token: str, params_digest: str) -> Optional[Dict[str, Any]]:
+        token_digest = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(token_digest)
+            if entry is None:
+                return None
+            entry_params_digest, claims, expires = entry
+            if entry_params_digest != params_digest or expires <= time.time():
+                return None
+            self._entries.move_to_end(token_digest)
+            return claims
+
+    def set(self, token: str, params_digest: str, claims: Dict[str, Any]) -> None:
+        expires = time.time() + self.ttl
+        if isinstance(claims.get("exp"), (int, float)):
+            expires = min(expires, claims["exp"])
+        token_digest = self.digest(token)
+        with self._lock:
+            self._entries[token_digest] = (params_digest, claims, expires)
+            self._entries.move_to_end(token_digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(self.digest(token), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class VerifiedCredentialCache():
+    """Bounded LRU cache of verified username and password pairs.
+    Only a keyed digest of the credential is kept and it's compared in constant time
+
+    :param ttl: seconds a verified credential is trusted without verifying its hash again
+    :param max_entries: maximum cached credentials, the least recently used is evicted first
+    """
+    def __init__(self, ttl: float = 60, max_entries: int = 1024) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._secret = os.urandom(32)
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def digest(self, username: str, password: str) -> bytes:
+        return hashlib.blake2b(f"{username}:{password}".encode(), key=self._secret).digest()
+
+    def check(self, username: str, password: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[1] <= time.time():
+                return False
+            self._entries.move_to_end(username)
+        return hmac.compare_digest(entry[0], self.digest(username, password))
+
+    def set(self, username: str, password: str) -> None:
+        entry = (self.digest(username, password), time.time() + self.ttl)
+        with self._lock:
+            self._entries[username] = entry
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, username: str) -> None:
+        with self._lock:
+            self._entries.pop(username, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class AuthorizationCache():
+    """Bounded LRU cache of authorization decisions keyed by principal, endpoint and required scopes
+
+    :param ttl: seconds a decision is reused without asking the policy again
+    :param max_entries: maximum cached decisions, the least recently used is evicted first
+    """
+    def __init__(self, ttl: float = 60, max_entries: int = 4096) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str, FrozenSet[str]], Tuple[bool, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(principal: Any) -> str:
+        data = json.dumps(principal_identity(principal), sort_keys=True)
+        return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+
+    def make_key(
+        self,
+        principal: Any,
+        endpoint: "EndpointDefinition",
+        scopes: FrozenSet[str]
+    ) -> Tuple[str, str, str, FrozenSet[str]]:
+        return (self.digest(principal), endpoint.method, endpoint.rule, scopes)
+
+    def get(self, key: Tuple[str, str, str, FrozenSet[str]]) -> Optional[bool]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: Tuple[str, str, str, FrozenSet[str]], allowed: bool) -> None:
+        with self._lock:
+            self._entries[key] = (allowed, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, principal: Any) -> None:
+        """
+        Drop all decisions of the principal, use it when its permissions are changed
+        """
+        principal_digest = self.digest(principal)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == principal_digest]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
 
 
 class HTTPSecurityBase(ABC):
     all_schemes = {}
+    authorization_cache_ttl: float = 0
+    authorization_cache_size: int = 4096
 
     @abstractmethod
     def __init__(self, scheme_name: str, scheme: HTTPScheme):
         self.scheme_name = scheme_name
         self.scheme = scheme
+        self.authorization_cache = None
+        if self.authorization_cache_ttl:
+            self.authorization_cache = AuthorizationCache(self.authorization_cache_ttl, self.authorization_cache_size)
         HTTPSecurityBase.all_schemes[scheme_name] = {"type": "http", "scheme": scheme.value}
     
     def __call__(self, req: Request) -> Any:
@@ -33,6 +208,54 @@ class HTTPSecurityBase(ABC):
             if request_scheme.lower() == self.scheme.value:
                 return data
     
+    def get_principal(self, req: Request) -> Any:
+        """
+        Override this to identify the requester, used as the key of per-principal cache
+        """
+        return HTTPSecurityBase.get_authorization_data(self, req)
+
+    def get_principal_key(self, principal: Any) -> Any:
+        """
+        Override this to identify a principal object in the cache, rate limit and idempotency keys (ex: `user.id`),
+        default is the principal itself and it must be JSON serializable or a pydantic model
+        """
+        return principal_identity(principal)
+
+    def set_verified_principal(self, principal: Any) -> None:
+        """
+        Keep the principal verified by `__call__` for `get_principal` of the same request
+        """
+        g.setdefault("verified_principals", {})[self.scheme_name] = principal
+
+    def get_verified_principal(self) -> Any:
+        """
+        Get the principal verified by `__call__` in this request, or `None`
+        """
+        return g.get("verified_principals", {}).get(self.scheme_name)
+
+    def authorize(self, principal: Any, endpoint: "EndpointDefinition", scopes: FrozenSet[str]) -> bool:
+        """
+        Override this to enable authorization check, return `False` to answer `403 Forbidden`
+        """
+        return True
+
+    @property
+    def has_authorization(self) -> bool:
+        return type(self).authorize is not HTTPSecurityBase.authorize
+
+    def is_authorized(self, principal: Any, endpoint: "EndpointDefinition", scopes: FrozenSet[str]) -> bool:
+        """
+        Get the authorization decision, reused from `authorization_cache` while it's fresh
+        """
+        if self.authorization_cache is None:
+            return self.authorize(principal, endpoint, scopes)
+        key = self.authorization_cache.make_key(self.get_principal_key(principal), endpoint, scopes)
+        allowed = self.authorization_cache.get(key)
+        if allowed is None:
+            allowed = bool(self.authorize(principal, endpoint, scopes))
+            self.authorization_cache.set(key, allowed)
+        return allowed
+
     @property
     def schema(self):
         return {self.scheme_name: []}
@@ -43,6 +266,15 @@ class HTTPBasicSecurity(HTTPSecurityBase):
     HTTP security authorization with `basic` username and password scheme
 
     :params scheme_name: set the security scheme name
+    :params get_password_hash: function that receives the username and returns its stored password hash,
+        or `None` if the user doesn't exist. Set this to verify the credentials on every request
+    :params verify_password: function that receives the password hash and the password,
+        default is `werkzeug.security.check_password_hash`
+    :params credential_cache_ttl: cache the verified credentials for some seconds, set `0` to verify every request
+    :params credential_cache_size: maximum cached verified credentials
+    :params max_workers: maximum password hashes verified at the same time
+    :params dummy_password_hash: hash verified for unknown usernames so they take as long as the known ones,
+        default is a `werkzeug.security.generate_password_hash` of a random password
 
     - use `self.decode` to decode the jwt function
     - override it if you dont want to use it
@@ -51,15 +283,94 @@ class HTTPBasicSecurity(HTTPSecurityBase):
     If you want to enable security scheme, you can inherit this class to override `__call__`.
     This could replacing the use `flask_login` decorator scheme.
     """
-    def __init__(self, scheme_name: Optional[str] = None):
+    def __init__(
+        self,
+        scheme_name: Optional[str] = None,
+        get_password_hash: Optional[Callable[[str], Optional[str]]] = None,
+        verify_password: Callable[[str, str], bool] = check_password_hash,
+        credential_cache_ttl: float = 0,
+        credential_cache_size: int = 1024,
+        max_workers: int = 4,
+        dummy_password_hash: Optional[str] = None
+    ):
         super().__init__(
             scheme_name=scheme_name or self.__class__.__name__,
             scheme=HTTPScheme.basic
         )
+        self.get_password_hash = get_password_hash
+        self.verify_password = verify_password
+        self.credential_cache = (
+            VerifiedCredentialCache(credential_cache_ttl, credential_cache_size) if credential_cache_ttl else None
+        )
+        self._executor = (
+            ThreadPoolExecutor(max_workers, thread_name_prefix=self.scheme_name) if get_password_hash else None
+        )
+        self._dummy_password_hash = dummy_password_hash
+
+    @property
+    def dummy_password_hash(self) -> str:
+        if self._dummy_password_hash is None:
+            self._dummy_password_hash = generate_password_hash(os.urandom(16).hex())
+        return self._dummy_password_hash
+
+    def __call__(self, req: Request) -> Any:
+        if self.get_password_hash is not None:
+            self.set_verified_principal(self.verify(req))
+        return req
+
+    def get_principal(self, req: Request) -> Any:
+        """
+        Get the username, the password is never a part of the principal
+        """
+        username = self.get_verified_principal()
+        if username is None:
+            try:
+                credentials = self.get_authorization_data(req)
+            except Exception:
+                credentials = None
+            username = credentials["username"] if credentials else None
+        return username
+
+    def verify(self, req: Request) -> str:
+        """
+        Verify the request credentials and return the username, raise `401 Unauthorized` if it's invalid
+        """
+        try:
+            credentials = self.get_authorization_data(req)
+        except Exception:
+            credentials = None
+        if not credentials or not self.authenticate(credentials["username"], credentials["password"]):
+            raise Unauthorized(response=JSONResponse(
+                {"detail": "Invalid credentials"},
+                status_code=401,
+                headers={"WWW-Authenticate": f'Basic realm="{self.scheme_name}"'}
+            ))
+        return credentials["username"]
+
+    def authenticate(self, username: str, password: str) -> bool:
+        """
+        Check the password against the stored hash, the hash is verified in a bounded thread pool
+        """
+        if self.credential_cache is not None and self.credential_cache.check(username, password):
+            return True
+        password_hash = self.get_password_hash(username)
+        if password_hash is None:
+            # verify a hash anyway so the response time doesn't tell whether the username exists
+            try:
+                self._executor.submit(self.verify_password, self.dummy_password_hash, password).result()
+            except Exception:
+                pass
+            return False
+        if not self._executor.submit(self.verify_password, password_hash, password).result():
+            return False
+        if self.credential_cache is not None:
+            self.credential_cache.set(username, password)
+        return True
 
     def get_authorization_data(self, req: Request):
         hashed = super().get_authorization_data(req)
-        return self.decode(hashed)
+        if hashed:
+            return self.decode(hashed)
 
     def decode(self, hashed: str):
         unhashed = b64decode(hashed).decode("ascii")
@@ -72,18 +383,120 @@ class HTTPBearerSecurity(HTTPSecurityBase):
     HTTP security authorization with `bearer` or token scheme
 
     :params scheme_name: set the security scheme name
+    :params token_cache_ttl: cache the verified tokens for some seconds (or until they're expired),
+        set `0` to verify every request
+    :params token_cache_size: maximum cached verified tokens
+    :params is_revoked: function that receives the token claims and returns `True` if it's revoked,
+        it's checked even if the token is cached
+    :params key_provider: `JWKSKeyProvider` to get the verification key by the token's `kid`
+        if `key` is not passed to `self.decode`
 
     - use `self.decode` to decode the jwt function
     - override it if you dont want to use it
     """
-    def __init__(self, scheme_name: Optional[str] = None):
+    def __init__(
+        self,
+        scheme_name: Optional[str] = None,
+        token_cache_ttl: float = 0,
+        token_cache_size: int = 1024,
+        is_revoked: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        key_provider: Optional[JWKSKeyProvider] = None
+    ):
         super().__init__(
             scheme_name=scheme_name or self.__class__.__name__,
             scheme=HTTPScheme.bearer
         )
+        self.token_cache = VerifiedTokenCache(token_cache_ttl, token_cache_size) if token_cache_ttl else None
+        self.is_revoked = is_revoked
+        self.key_provider = key_provider
     
-    def decode(token, key, algorithms=None, options=None, audience=None, issuer=None, subject=None, access_token=None):
+    def decode(self, token, key=None, algorithms=None, options=None, audience=None, issuer=None, subject=None, access_token=None):
         """
         JWT Token decode function using `python-jose`
         """
-        return jwt.decode(token, key, algorithms, options, audience, issuer, subject, access_token)
\ No newline at end of file
+        if key is None and self.key_provider is not None:
+            key, algorithm = self.key_provider.get_signing_key(token)
+            algorithms = algorithms or [algorithm]
+        if self.token_cache is None:
+            claims = jwt.decode(token, key, algorithms, options, audience, issuer, subject, access_token)
+        else:
+            params_digest = self.token_cache.digest(json.dumps(
+                [key, algorithms, options, audience, issuer, subject, access_token], sort_keys=True, default=str
+            ))
+            claims = self.token_cache.get(token, params_digest)
+            if claims is None:
+                claims = jwt.decode(token, key, algorithms, options, audience, issuer, subject, access_token)
+                self.token_cache.set(token, params_digest, claims)
+        if self.is_revoked and self.is_revoked(claims):
+            raise jwt.JWTError("Token has been revoked")
+        return claims
+
+    def revoke_token(self, token: str):
+        """
+        Remove the token from verified token cache
+        """
+        if self.token_cache is not None:
+            self.token_cache.discard(token)
+
+
+class APIKeySecurity(HTTPSecurityBase):
+    """
+    API key security authorization from a header, query or cookie
+
+    :params name: name of the header, query or cookie
+    :params location: where the API key is sent, `APIKeyLocation` or its value
+    :params scheme_name: set the security scheme name
+    :params index: `APIKeyIndex` to verify the API key on every request, raise `401 Unauthorized` if it's unknown
+
+    If you want to verify the API key by yourself, you can inherit this class to override `__call__`.
+    """
+    def __init__(
+        self,
+        name: str = "X-API-Key",
+        location: APIKeyLocation = APIKeyLocation.header,
+        scheme_name: Optional[str] = None,
+        index: Optional[APIKeyIndex] = None
+    ):
+        super().__init__(
+            scheme_name=scheme_name or self.__class__.__name__,
+            scheme=HTTPScheme.api_key
+        )
+        self.name = name
+        self.location = APIKeyLocation(location)
+        self.index = index
+        HTTPSecurityBase.all_schemes[self.scheme_name] = {
+            "type": HTTPScheme.api_key.value,
+            "in": self.location.value,
+            "name": name
+        }
+
+    def __call__(self, req: Request) -> Any:
+        if self.index is not None:
+            self.set_verified_principal(self.verify(req))
+        return req
+
+    def get_authorization_data(self, req: Request) -> Optional[str]:
+        if self.location == APIKeyLocation.header:
+            return req.headers.get(self.name)
+        if self.location == APIKeyLocation.query:
+            return req.args.get(self.name)
+        return req.cookies.get(self.name)
+
+    def get_principal(self, req: Request) -> Any:
+        principal = self.get_verified_principal()
+        if principal is not None:
+            return principal
+        key = self.get_authorization_data(req)
+        if key and self.index is not None:
+            return self.index.lookup(key)
+        return key
+
+    def verify(self, req: Request) -> Any:
+        """
+        Verify the API key and return its principal, raise `401 Unauthorized` if it's unknown
+        """
+        key = self.get_authorization_data(req)
+        principal = self.index.lookup(key) if key else None
+        if principal is None:
+            raise Unauthorized(response=JSONResponse({"detail": "Invalid API key"}, status_code=401))
+        return principal
\ No newline at end of file
@@ -0,0 +1,189 @@
+import codecs as text_codecs
+import json
+from flask import Request
+from pydantic import BaseModel, ValidationError, create_model
+from pydantic.error_wrappers import ErrorWrapper
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Union
+from werkzeug.exceptions import BadRequest
+
+from .codec import JSONCodec, codecs
+from .limits import BodyLimits
+
+CHUNK_SIZE = 64 * 1024
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+_decoder = json.JSONDecoder()
+_whitespace = " \t\n\r"
+_delimiters = _whitespace + ",]"
+
+
+def get_stream_item_type(annot: Any) -> Any:
+    """
+    Get the item type of a streamed body annotation, ex: `List[Item]` -> `Item`
+    """
+    args = getattr(annot, "__args__", None)
+    return args[0] if args else Any
+
+
+def iter_json_array(stream: Any, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Decode the items of a JSON array from a binary stream while it's read in bounded chunks
+    """
+    decoder = text_codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    eof = False
+
+    def fill() -> None:
+        nonlocal buffer, position, eof
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + decoder.decode(chunk or b"", final=eof)
+        position = 0
+
+    def next_char() -> Optional[str]:
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in _whitespace:
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if eof:
+                return None
+            fill()
+
+    try:
+        if next_char() != "[":
+            raise BadRequest("Request body must be a JSON array")
+        position += 1
+        if next_char() != "]":
+            while True:
+                while True:
+                    try:
+                        item, end = _decoder.raw_decode(buffer, position)
+                        # a number may continue in the next chunk unless it's followed by a delimiter
+                        if eof or end < len(buffer) and buffer[end] in _delimiters:
+                            break
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                    fill()
+                position = end
+                yield item
+                char = next_char()
+                if char == "]":
+                    break
+                if char != ",":
+                    raise BadRequest("Invalid JSON array in request body")
+                position += 1
+                next_char()
+        # only whitespace may follow the array, the rest of the stream is read to check it
+        position += 1
+        if next_char() is not None:
+            raise BadRequest("Unexpected data after the JSON array in request body")
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise BadRequest("Failed to decode JSON array request body") from e
+
+
+def iter_ndjson(stream: Any, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Decode newline delimited JSON values from a binary stream while it's read in bounded chunks
+    """
+    buffer = b""
+    line_number = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        lines = (buffer + chunk).split(b"\n") if chunk else [buffer]
+        buffer = lines.pop() if chunk else b""
+        for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                raise BadRequest(f"Failed to decode NDJSON request body at line {line_number}") from e
+        if not chunk:
+            return
+
+
+def iter_batches(items: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def get_item_validator(item_type: Any) -> Callable[[Any], Any]:
+    if isinstance(item_type, type) and issubclass(item_type, BaseModel):
+        return item_type.parse_obj
+    model = create_model("StreamItem", __root__=(item_type, ...))
+    return lambda item: model.parse_obj(item).__root__
+
+
+def iter_validated(items: Iterable[Any], item_type: Any, loc: Union[str, int]) -> Iterator[Any]:
+    """Validate the items one by one while they're consumed,
+    the error is raised with the item index in its location
+    """
+    for batch in iter_validated_batches(items, item_type, loc, 1):
+        yield batch[0]
+
+
+def iter_validated_batches(items: Iterable[Any], item_type: Any, loc: Union[str, int], batch_size: int) -> Iterator[List[Any]]:
+    """Validate the items in batches while they're consumed,
+    the errors of all invalid items of a batch are raised together with the item indexes in their location
+    """
+    validate = get_item_validator(item_type)
+    is_model = isinstance(item_type, type) and issubclass(item_type, BaseModel)
+    index = 0
+    for batch in iter_batches(items, batch_size):
+        validated, errors = [], []
+        for item in batch:
+            try:
+                validated.append(validate(item))
+            except ValidationError as e:
+                if is_model:
+                    errors.append(ErrorWrapper(e, loc=(loc, index)))
+                else:
+                    # drop the `__root__` location of the item wrapper model
+                    errors.extend(ErrorWrapper(w.exc, loc=(loc, index)) for w in e.raw_errors)
+            index += 1
+        if errors:
+            raise ValidationError(errors, item_type if is_model else BaseModel)
+        yield validated
+
+
+def stream_request_body(
+    req: Request,
+    annot: Any,
+    loc: Union[str, int],
+    batch_size: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    body_limits: Optional[BodyLimits] = None
+) -> Iterator[Any]:
+    """Lazily decode and validate the items of the request body array or NDJSON lines
+
+    :param batch_size: validate the items in batches and yield the batches instead of the items
+    :param body_limits: checked on every item before it's validated, `max_array_length` limits the items count
+    """
+    codec = codecs.get(req.mimetype)
+    if req.mimetype == NDJSON_MEDIA_TYPE:
+        items = iter_ndjson(req._get_stream_for_parsing(), chunk_size)
+    elif codec is not None and codec.media_type != JSONCodec.media_type:
+        # only JSON is decoded incrementally, the other codecs decode the whole body
+        data = req.get_data(cache=True)
+        try:
+            items = iter(codec.decode(data))
+        except Exception as e:
+            raise BadRequest(f"Failed to decode {codec.media_type} request body") from e
+    else:
+        items = iter_json_array(req._get_stream_for_parsing(), chunk_size)
+    if body_limits:
+        items = body_limits.iter_checked(items)
+    if batch_size:
+        return iter_validated_batches(items, get_stream_item_type(annot), loc, batch_size)
+    return iter_validated(items, get_stream_item_type(annot), loc)
@@ -1,3 +1,4 @@
+import copy
 import json
 import os
 import enum
@@ -9,9 +10,14 @@ from flask.scaffold import _sentinel
 from pydantic import BaseModel, create_model
 
 from .flask_swagger_ui import get_swaggerui_blueprint
-from ..params import ParamsType, FormType, ParamSignature, Header, Path, Query, Body, Form, FormURLEncoded, File
+from ..admission import Priority
+from ..codec import codecs
+from ..idempotency import IDEMPOTENT_METHODS
+from ..projection import FIELDS_PARAM
+from ..params import ParamsType, FormType, ParamSignature, is_multi_value, Header, Path, Query, Body, Form, FormURLEncoded, File
 from ..routing import APIRouter, EndpointDefinition
 from ..security import HTTPSecurityBase, HTTPScheme
+from ..streaming import NDJSON_MEDIA_TYPE, get_stream_item_type
 
 
 class SwaggerGenerator(Blueprint):
@@ -110,11 +116,19 @@ class SwaggerGenerator(Blueprint):
                             "tags": ep.tags,
                             "summary": ep.summary,
                             "parameters": param_schema,
-                            "responses": ep.responses
+                            "responses": copy.deepcopy(ep.responses)
                         }
                         if param_definition_schema:
                             self.template["components"]["schemas"].update(param_definition_schema)
 
+                        ## define sparse fieldsets parameter
+                        if ep.sparse_fields:
+                            param_schema.append(self.generate_sparse_fields_schema(ep))
+
+                        ## define http caching headers
+                        if ep.etag or ep.cache_control:
+                            self.generate_caching_schema(ep, self.template["paths"][ep.rule][ep.method])
+
                         ## define body schema
                         if ep.method not in ["get", "delete"]:
                             body_schema = self.generate_body_json_schema(ep.rule.replace("/","-"), ep.paired_params)
@@ -129,6 +143,10 @@ class SwaggerGenerator(Blueprint):
                                         }
                                     }
                                 }
+                                if body_schema.get("type") == "array" and self.has_stream_body(ep.paired_params):
+                                    self.template["paths"][ep.rule][ep.method]["requestBody"]["content"][NDJSON_MEDIA_TYPE] = {
+                                        "schema": body_schema["items"]
+                                    }
 
                         ## define body form, form-urlencoded, file
                         all_forms = {
@@ -181,9 +199,42 @@ class SwaggerGenerator(Blueprint):
                                 self.template["paths"][ep.rule][ep.method]["requestBody"] = {"content":{}}
                             self.template["paths"][ep.rule][ep.method]["requestBody"]["content"].update(final_form_schema)
 
+                        ## define body limits
+                        if ep.body_limits and "requestBody" in self.template["paths"][ep.rule][ep.method]:
+                            self.generate_body_limits_schema(ep, self.template["paths"][ep.rule][ep.method])
+
+                        ## define rate limit
+                        if ep.rate_limit:
+                            self.generate_rate_limit_schema(ep, self.template["paths"][ep.rule][ep.method])
+
+                        ## define concurrency limit
+                        if ep.concurrency_limit:
+                            self.generate_concurrency_limit_schema(ep, self.template["paths"][ep.rule][ep.method])
+
+                        ## define idempotency
+                        if ep.idempotency and ep.method.upper() in IDEMPOTENT_METHODS:
+                            self.generate_idempotency_schema(ep, self.template["paths"][ep.rule][ep.method])
+
+                        ## define deadline
+                        if ep.timeout:
+                            self.generate_deadline_schema(ep, self.template["paths"][ep.rule][ep.method])
+
+                        ## define process executor
+                        if ep.executor:
+                            self.template["paths"][ep.rule][ep.method]["x-executor"] = "process"
+
+                        ## define admission control
+                        if ep.admission:
+                            self.generate_admission_schema(ep, self.template["paths"][ep.rule][ep.method])
+
+                        ## define all supported media types
+                        self.generate_media_types_schema(self.template["paths"][ep.rule][ep.method])
+
                         ## define security scheme
                         if ep.security:
                             self.template["paths"][ep.rule][ep.method]["security"] = [ep.security.schema]
+                            if ep.security.has_authorization:
+                                self.generate_authorization_schema(ep, self.template["paths"][ep.rule][ep.method])
 
         if self.additional_path:
             self.template["paths"].update(self.additional_path)
@@ -223,6 +274,11 @@ class SwaggerGenerator(Blueprint):
                     schema["required"] = True
                 if po.description:
                     schema["description"] = po.description
+                if isinstance(po, Query) and is_multi_value(p._type):
+                    schema["style"] = "form"
+                    schema["explode"] = po.explode
+                elif isinstance(po, Header) and is_multi_value(p._type):
+                    schema["style"] = "simple"
                 if "definitions" in sub_schema:
                     definitions.update(sub_schema.pop("definitions"))
                     allof = sub_schema.pop("properties")[k]
@@ -235,14 +291,179 @@ class SwaggerGenerator(Blueprint):
                 schemas.append(schema)
         return schemas, definitions
 
+    def generate_sparse_fields_schema(self, ep: EndpointDefinition):
+        schema = {
+            "name": FIELDS_PARAM,
+            "in": "query",
+            "description": "Comma separated response fields to include, use dot for nested fields",
+            "schema": {"type": "string"}
+        }
+        if ep.response_model:
+            schema["example"] = ",".join(list(ep.response_model.__fields__)[:3])
+        return schema
+
+    def generate_caching_schema(self, ep: EndpointDefinition, operation: Dict[str, Any]):
+        responses = operation["responses"]
+        success_key = 200 if 200 in responses else "200"
+        success = responses.setdefault(success_key, {"description": ep.response_description})
+        headers = success.setdefault("headers", {})
+        if ep.cache_control:
+            headers["Cache-Control"] = {
+                "description": "Caching directives of the response",
+                "schema": {"type": "string", "example": ep.cache_control}
+            }
+        if ep.etag:
+            headers["ETag"] = {
+                "description": "Weak entity tag of the response" if ep.weak_etag else "Entity tag of the response",
+                "schema": {"type": "string"}
+            }
+            responses["304"] = {"description": "Not Modified"}
+            operation["parameters"].append({
+                "name": "If-None-Match",
+                "in": "header",
+                "description": "Entity tags of the client copy",
+                "schema": {"type": "string"}
+            })
+
+    def generate_rate_limit_schema(self, ep: EndpointDefinition, operation: Dict[str, Any]):
+        operation["x-rate-limit"] = {
+            "limit": ep.rate_limit.limit,
+            "period": ep.rate_limit.period,
+            "burst": ep.rate_limit.burst
+        }
+        operation["responses"]["429"] = {
+            "description": f"Too Many Requests, limited to {ep.rate_limit.description}",
+            "headers": {
+                "Retry-After": {
+                    "description": "Seconds to wait before retrying",
+                    "schema": {"type": "integer"}
+                }
+            },
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Too Many Requests"}
+                }
+            }
+        }
+
+    def generate_concurrency_limit_schema(self, ep: EndpointDefinition, operation: Dict[str, Any]):
+        operation["x-max-concurrency"] = ep.concurrency_limit.max_concurrency
+        operation["responses"].setdefault(str(ep.concurrency_limit.status_code), {
+            "description": f"{ep.concurrency_limit.description}, the endpoint is busy",
+            "headers": {
+                "Retry-After": {
+                    "description": "Seconds to wait before retrying",
+                    "schema": {"type": "integer"}
+                }
+            },
+            "content": {
+                "application/json": {
+                    "example": {"detail": ep.concurrency_limit.description}
+                }
+            }
+        })
+
+    def generate_idempotency_schema(self, ep: EndpointDefinition, operation: Dict[str, Any]):
+        operation["parameters"].append({
+            "name": ep.idempotency.header,
+            "in": "header",
+            "required": ep.idempotency.required,
+            "description": "Unique key of the request, its retries with the same key get the first response replayed",
+            "schema": {"type": "string"}
+        })
+        operation["responses"]["409"] = {
+            "description": f"Conflict, a request with the same {ep.idempotency.header} is still in progress",
+            "content": {
+                "application/json": {
+                    "example": {"detail": f"A request with the same {ep.idempotency.header} is still in progress"}
+                }
+            }
+        }
+
+    def generate_deadline_schema(self, ep: EndpointDefinition, operation: Dict[str, Any]):
+        operation["x-timeout"] = ep.timeout
+        if ep.deadline_header:
+            operation["parameters"].append({
+                "name": ep.deadline_header,
+                "in": "header",
+                "description": f"Seconds the client waits for the response, shortens the {ep.timeout:g} seconds deadline",
+                "schema": {"type": "number"}
+            })
+        operation["responses"]["504"] = {
+            "description": "Gateway Timeout, the request deadline is exceeded",
+            "content": {
+                "application/json": {
+                    "example": {"detail": f"Request deadline of {ep.timeout:g} seconds is exceeded"}
+                }
+            }
+        }
+
+    def generate_body_limits_schema(self, ep: EndpointDefinition, operation: Dict[str, Any]):
+        operation["x-body-limits"] = ep.body_limits.to_dict()
+        if ep.body_limits.max_bytes is not None:
+            operation["responses"]["413"] = {
+                "description": f"Request Entity Too Large, the request body exceeds {ep.body_limits.max_bytes} bytes"
+            }
+        if ep.body_limits.has_structure_limits:
+            operation["responses"].setdefault("422", {
+                "description": "Unprocessable Entity, the request body exceeds the nesting depth, array length or keys limits"
+            })
+
+    def generate_admission_schema(self, ep: EndpointDefinition, operation: Dict[str, Any]):
+        operation["x-priority"] = ep.priority.name
+        if ep.priority == Priority.low:
+            status_code, description = "429", "Too Many Requests"
+        else:
+            status_code, description = "503", "Service Unavailable"
+        operation["responses"].setdefault(status_code, {
+            "description": f"{description}, the request is shed while the server is busy",
+            "headers": {
+                "Retry-After": {
+                    "description": "Seconds to wait before retrying",
+                    "schema": {"type": "integer"}
+                }
+            },
+            "content": {
+                "application/json": {
+                    "example": {"detail": description}
+                }
+            }
+        })
+
+    def generate_authorization_schema(self, ep: EndpointDefinition, operation: Dict[str, Any]):
+        if ep.scopes:
+            operation["x-scopes"] = ep.scopes
+        operation["responses"]["403"] = {
+            "description": "Forbidden",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Forbidden"}
+                }
+            }
+        }
+
+    def generate_media_types_schema(self, operation: Dict[str, Any]):
+        contents = [operation.get("requestBody", {}).get("content", {})]
+        for status_code, response in operation["responses"].items():
+            if str(status_code).startswith("2"):
+                contents.append(response.get("content", {}))
+        for content in contents:
+            if "application/json" in content:
+                for media_type in codecs.media_types:
+                    content.setdefault(media_type, content["application/json"])
+
     def generate_body_json_schema(self, name: str, paired_params: Dict[str, ParamSignature]):
         preschema = {}
         lk = ""
+        stream = False
         for k, p in paired_params.items():
             po = p.param_object
             k = p.param_object.alias or k
             if type(po) == Body:
-                if po.pydantic_model:
+                if po.stream:
+                    preschema[k] = (List[get_stream_item_type(p._type)], po.default)
+                    stream = True
+                elif po.pydantic_model:
                     if po.example:
                         preschema[k] = (po.pydantic_model, po)
                     else:
@@ -255,7 +476,9 @@ class SwaggerGenerator(Blueprint):
                 lk = k
         if preschema:
             if len(preschema) == 1:
-                if BaseModel.__subclasscheck__(preschema[lk][0]):
+                if stream:
+                    ss = create_model(name, __root__=preschema[lk])
+                elif BaseModel.__subclasscheck__(preschema[lk][0]):
                     ss = preschema[k][0]
                 else:
                     ss = create_model(name, **preschema)
@@ -263,6 +486,9 @@ class SwaggerGenerator(Blueprint):
                 ss = create_model(name, **preschema)
             return ss.schema(ref_template="#/components/schemas/{model}")
 
+    def has_stream_body(self, paired_params: Dict[str, ParamSignature]) -> bool:
+        return any(type(p.param_object) == Body and p.param_object.stream for p in paired_params.values())
+
     def _generate_form_schema(
             self,
             name: str,
@@ -0,0 +1,192 @@
+import hashlib
+import shutil
+from tempfile import SpooledTemporaryFile
+from flask import Request
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from werkzeug.datastructures import FileStorage, Headers, MultiDict
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File as FilePart, MultipartDecoder, NeedData
+
+from .fields import File
+
+CHUNK_SIZE = 64 * 1024
+
+# default of each text field when the request has no `max_form_memory_size`, as werkzeug 3
+MAX_FIELD_SIZE = 500 * 1000
+
+
+class UploadFile(FileStorage):
+    """Uploaded file that was streamed into a spooled temporary file
+
+    :param size: bytes of the uploaded file
+    :param digest: hex digest of the uploaded file if its `File` parameter defines the `hash`
+    :param hash_name: `hashlib` algorithm name of the `digest`
+    """
+    def __init__(
+        self,
+        stream: Any = None,
+        filename: Optional[str] = None,
+        name: Optional[str] = None,
+        content_type: Optional[str] = None,
+        headers: Optional[Headers] = None,
+        size: int = 0,
+        digest: Optional[str] = None,
+        hash_name: Optional[str] = None
+    ) -> None:
+        super().__init__(stream=stream, filename=filename, name=name, content_type=content_type, headers=headers)
+        self.size = size
+        self.digest = digest
+        self.hash_name = hash_name
+
+    @property
+    def content_length(self) -> int:
+        return self.size
+
+    @property
+    def in_memory(self) -> bool:
+        return not getattr(self.stream, "_rolled", True)
+
+    def iter_chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        self.stream.seek(0)
+        while True:
+            chunk = self.stream.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def save(self, dst: Any, buffer_size: int = CHUNK_SIZE) -> None:
+        self.stream.seek(0)
+        if isinstance(dst, str) or hasattr(dst, "__fspath__"):
+            with open(dst, "wb") as f:
+                shutil.copyfileobj(self.stream, f, buffer_size)
+        else:
+            shutil.copyfileobj(self.stream, dst, buffer_size)
+
+    @classmethod
+    def __get_validators__(cls) -> Iterator[Callable[..., Any]]:
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, value: Any) -> FileStorage:
+        if not isinstance(value, FileStorage):
+            raise TypeError("file upload expected")
+        return value
+
+    @classmethod
+    def __modify_schema__(cls, field_schema: Dict[str, Any]) -> None:
+        field_schema.update(type="string", format="binary")
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self.filename!r} ({self.content_type!r}, {self.size} bytes)>"
+
+
+class UploadSpool():
+    """Receive the chunks of a file part, reject it once it's oversized and compute its digest in the same pass
+
+    :param name: form field name
+    :param param: `File` parameter of the field, `None` uses the defaults
+    """
+    def __init__(self, name: str, param: Optional[File] = None) -> None:
+        self.name = name
+        self.max_size = getattr(param, "max_size", None)
+        self.hash_name = getattr(param, "hash", None)
+        self.size = 0
+        self._hash = hashlib.new(self.hash_name) if self.hash_name else None
+        self._file = SpooledTemporaryFile(max_size=getattr(param, "spool_threshold", 1024 * 1024))
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            self._file.close()
+            raise RequestEntityTooLarge(f"File '{self.name}' exceeds {self.max_size} bytes")
+        if self._hash is not None:
+            self._hash.update(data)
+        self._file.write(data)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def to_upload(self, part: FilePart) -> UploadFile:
+        self._file.seek(0)
+        return UploadFile(
+            stream=self._file,
+            filename=part.filename,
+            name=part.name,
+            content_type=part.headers.get("Content-Type"),
+            headers=part.headers,
+            size=self.size,
+            digest=self._hash.hexdigest() if self._hash is not None else None,
+            hash_name=self.hash_name
+        )
+
+
+def parse_multipart(
+    req: Request,
+    file_params: Optional[Dict[str, File]] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> Tuple[MultiDict, MultiDict]:
+    """Stream `multipart/form-data` request body in bounded chunks, the file parts are
+    spooled and checked against their `File` parameter while they're received,
+    each text field is limited to the request's `max_form_memory_size`
+
+    :param file_params: `File` parameters keyed by form field name
+    :return: (form, files), they're also cached as the request's `form` and `files`
+    """
+    if "files" in req.__dict__:
+        return req.form, req.files
+    boundary = req.mimetype_params.get("boundary")
+    if req.mimetype != "multipart/form-data" or not boundary:
+        return req.form, req.files
+
+    file_params = file_params or {}
+    max_field_size = req.max_form_memory_size or MAX_FIELD_SIZE
+    decoder = MultipartDecoder(boundary.encode("ascii"), max_field_size)
+    stream = req._get_stream_for_parsing()
+    form, files = MultiDict(), MultiDict()
+    part, field_data, field_size, spool = None, [], 0, None
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                if isinstance(event, FilePart):
+                    part, spool = event, UploadSpool(event.name, file_params.get(event.name))
+                elif isinstance(event, Field):
+                    part, field_data, field_size = event, [], 0
+                elif isinstance(event, Data):
+                    if isinstance(part, FilePart):
+                        spool.write(event.data)
+                        if not event.more_data:
+                            if part.filename:
+                                files.add(part.name, spool.to_upload(part))
+                            else:
+                                spool.close()
+                            spool = None
+                    else:
+                        # text fields are kept in memory, unlike the spooled files
+                        field_size += len(event.data)
+                        if field_size > max_field_size:
+                            raise RequestEntityTooLarge(f"Form field '{part.name}' exceeds {max_field_size} bytes")
+                        field_data.append(event.data)
+                        if not event.more_data:
+                            form.add(part.name, b"".join(field_data).decode("utf-8", "replace"))
+                event = decoder.next_event()
+            if isinstance(event, Epilogue):
+                break
+            if not chunk:
+                raise BadRequest("Truncated multipart/form-data request body")
+    except Exception as e:
+        # the files already received are spooled, maybe on disk, don't leave them to the garbage collector
+        for _, upload in files.items(multi=True):
+            upload.close()
+        if isinstance(e, ValueError):
+            raise BadRequest("Invalid multipart/form-data request body") from e
+        raise
+    finally:
+        if spool is not None:
+            spool.close()
+
+    req.__dict__["form"] = form
+    req.__dict__["files"] = files
+    return form, files
@@ -21,6 +21,7 @@ setup(
     long_description=long_description,
     packages=find_packages(),
     install_requires=["flask>=2.0.0","werkzeug>=2.0.0","flask-http-middleware", "pydantic", "python-jose"],
+    extras_require={"msgpack": ["msgpack"]},
     keywords=['flask', 'middleware', 'http', 'request', "response", "swagger", "openapi", "toolkit"],
     include_package_data=True,
     classifiers=[
@@ -0,0 +1,85 @@
+from flask import Flask, g, request
+from werkzeug.datastructures import Headers
+
+from flask_toolkits import APIRouter, Body, Query, RateLimit
+from flask_toolkits.batch import BatchDispatcher, BatchRequest
+
+
+def create_app():
+    router = APIRouter("batch_test", __name__, sparse_fields=True)
+
+    @router.get("/items/<int:id>")
+    def get_item(id: int, verbose: bool = Query(False)):
+        return {"id": id, "name": f"item-{id}", "verbose": verbose}
+
+    @router.get("/limited", rate_limit=RateLimit(1, 60, key="ip"))
+    def limited():
+        return {"remote_addr": request.remote_addr, "url": request.url}
+
+    @router.post("/orders", idempotent=True)
+    def create_order(name: str = Body()):
+        return {"name": name}
+
+    router.batch_endpoint("/batch", max_concurrency=1)
+    app = Flask(__name__)
+    app.register_blueprint(router)
+    return app
+
+
+def test_sparse_fields_sub_request_does_not_leak():
+    app = create_app()
+    client = app.test_client()
+    response = client.post("/batch", json=[
+        {"method": "GET", "path": "/items/1", "query": {"fields": "id"}},
+        {"method": "POST", "path": "/items/2"},
+        {"method": "GET", "path": "/items/3"},
+    ])
+    assert response.status_code == 200
+    first, second, third = response.json
+    assert first["body"] == {"id": 1}
+    assert second["status"] == 405
+    assert third["body"] == {"id": 3, "name": "item-3", "verbose": False}
+
+
+def test_sub_requests_have_their_own_globals():
+    app = create_app()
+    with app.test_request_context("/batch", method="POST"):
+        g.marker = "batch"
+        sub_request = BatchRequest(path="/items/1", query={"fields": "id"})
+        response = BatchDispatcher().dispatch_one(app, sub_request, Headers())
+        assert response["body"] == {"id": 1}
+        assert g.marker == "batch"
+        assert "sparse_fields" not in g
+
+
+def test_sub_requests_inherit_client_address():
+    app = create_app()
+    client = app.test_client()
+    first = client.post(
+        "https://api.example.com/batch",
+        json=[{"path": "/limited"}],
+        environ_base={"REMOTE_ADDR": "2.2.2.2"}
+    )
+    second = client.post(
+        "https://api.example.com/batch",
+        json=[{"path": "/limited"}],
+        environ_base={"REMOTE_ADDR": "3.3.3.3"}
+    )
+    assert first.json[0]["body"] == {"remote_addr": "2.2.2.2", "url": "https://api.example.com/limited"}
+    assert second.json[0]["status"] == 200
+    assert second.json[0]["body"]["remote_addr"] == "3.3.3.3"
+
+
+def test_sub_requests_do_not_inherit_per_request_headers():
+    app = create_app()
+    client = app.test_client()
+    response = client.post("/batch", json=[
+        {"method": "POST", "path": "/orders", "body": {"name": "first"}},
+        {"method": "POST", "path": "/orders", "body": {"name": "second"}},
+        {"method": "GET", "path": "/items/1"},
+    ], headers={"Idempotency-Key": "batch-1", "If-None-Match": "*"})
+    assert response.status_code == 200
+    first, second, third = response.json
+    assert first["status"] == 200 and first["body"] == {"name": "first"}
+    assert second["status"] == 200 and second["body"] == {"name": "second"}
+    assert third["status"] == 200